@@ -1,9 +1,109 @@
+import gzip
+import heapq
 import json
-from datetime import datetime, timedelta
+from collections import Counter
+from datetime import datetime
+
+from sketches import CountMinSketch, HyperLogLog, SpaceSaving
+from user_behavior import CATEGORIES
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # تصدير Parquet اختياري
+    pa = pq = None
+
+# حدود مستويات التفاعل (عدد التفاعلات)
+MEDIUM_ENGAGEMENT = 5
+HIGH_ENGAGEMENT = 20
+
+
+def _open_output(filename):
+    if str(filename).endswith(".gz"):
+        return gzip.open(filename, "wt", encoding="utf-8")
+    return open(filename, "w", encoding="utf-8")
+
+
+class DailyItemCounter:
+    """
+    عدادات العناصر في دلاء يومية (دلو لكل يوم)
+    الدلاء الأقدم من retention_days تُحذف تلقائياً فتبقى الذاكرة محدودة
+    """
+
+    def __init__(self, retention_days=30):
+        self.retention_days = retention_days
+        self.buckets = {}  # رقم اليوم -> {العنصر: العدد}
+        self.latest_day = None
+
+    def add(self, item_name, day, count=1):
+        if self.latest_day is None or day > self.latest_day:
+            self.latest_day = day
+            self._evict()
+        elif day <= self.latest_day - self.retention_days:
+            return  # أقدم من فترة الاحتفاظ
+        bucket = self.buckets.setdefault(day, {})
+        bucket[item_name] = bucket.get(item_name, 0) + count
+
+    def _evict(self):
+        oldest = self.latest_day - self.retention_days
+        for day in [d for d in self.buckets if d <= oldest]:
+            del self.buckets[day]
+
+    def top(self, today, days, limit=10):
+        """أكثر العناصر خلال آخر days يوماً (اليوم منها)، بدمج days دلواً على الأكثر"""
+        totals = {}
+        for day in range(today - days + 1, today + 1):
+            for item_name, count in self.buckets.get(day, {}).items():
+                totals[item_name] = totals.get(item_name, 0) + count
+        return heapq.nlargest(limit, totals.items(), key=lambda x: x[1])
+
+
+class InteractionLog:
+    """
+    سجل تفاعلات (سطر JSON لكل تفاعل) يُدرَّب منه matrix_factorization.py
+    user_id و item يجب أن يكونا نفس المعرفات التي يخدمها النموذج لاحقاً
+    (في server.py: معرف مستخدم Firestore ومعرف المنتج في الكتالوج)
+    """
+
+    def __init__(self, filename):
+        self._file = open(filename, 'a', encoding='utf-8', buffering=1)
+
+    def write(self, user_id, item, action, duration=None, timestamp=None):
+        self._file.write(json.dumps({
+            "user_id": user_id, "item": item, "action": action,
+            "duration": duration, "timestamp": (timestamp or datetime.now()).isoformat()
+        }, ensure_ascii=False) + "\n")
+
+    def close(self):
+        self._file.close()
+
 
 class AnalyticsDashboard:
-    def __init__(self, recommender):
+    def __init__(self, recommender, retention_days=30, clock=datetime.now, sketch=False,
+                 interaction_log=None):
         self.recommender = recommender
+        # سجل تفاعلات اختياري (سطر JSON لكل تفاعل) لتدريب matrix_factorization.py
+        self.interaction_log = InteractionLog(interaction_log) if interaction_log else None
+        self.clock = clock
+        self.item_counts = DailyItemCounter(retention_days)
+        self.retention_days = retention_days
+        # وضع التقدير: ذاكرة ثابتة بدلاً من سجل لكل مستخدم (انظر sketches.py للأخطاء)
+        self.sketch = sketch
+        if sketch:
+            self.item_sketch = CountMinSketch.from_error(epsilon=0.001, delta=0.01)
+            self.category_sketch = CountMinSketch(width=256, depth=4)
+            self.user_sketch = CountMinSketch.from_error(epsilon=0.0005, delta=0.01)
+            self.heavy_hitters = SpaceSaving(capacity=200)
+            self.daily_active = {}  # اليوم -> HyperLogLog
+            self.all_users = HyperLogLog()
+            self.medium_users = HyperLogLog()
+            self.high_users = HyperLogLog()
+            self.categories = set()
+
+        # مجاميع جارية للتصدير: كل تصدير يضيف أحداث المستخدمين الجديدة فقط
+        self._event_offsets = {}  # المستخدم -> عدد أحداثه المحسوبة حتى الآن
+        self._category_totals = Counter()
+        self._total_interactions = 0
         self.analytics_data = {
             "daily_interactions": {},
             "user_engagement": {},
@@ -11,9 +111,25 @@ class AnalyticsDashboard:
             "recommendation_performance": []
         }
     
-    def track_interaction(self, user_id, item_name, action):
+    def close(self):
+        """إغلاق سجل التفاعلات (إن وُجد)"""
+        if self.interaction_log is not None:
+            self.interaction_log.close()
+            self.interaction_log = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def track_interaction(self, user_id, item_name, action, category=None, duration=None):
         """تتبع التفاعلات"""
-        today = datetime.now().strftime("%Y-%m-%d")
+        now = self.clock()
+        today = now.strftime("%Y-%m-%d")
+        self.item_counts.add(item_name, now.toordinal())
+        if self.interaction_log is not None:
+            self.interaction_log.write(user_id, item_name, action, duration, now)
         
         if today not in self.analytics_data["daily_interactions"]:
             self.analytics_data["daily_interactions"][today] = {}
@@ -22,56 +138,155 @@ class AnalyticsDashboard:
             self.analytics_data["daily_interactions"][today][action] = 0
         
         self.analytics_data["daily_interactions"][today][action] += 1
+
+        if self.sketch:
+            self._track_sketches(user_id, item_name, category, today)
+            return
         
         # تحديث تفاعل المستخدم
         if user_id not in self.analytics_data["user_engagement"]:
             self.analytics_data["user_engagement"][user_id] = {
                 "total_interactions": 0,
-                "last_active": datetime.now().isoformat()
+                "last_active": now.isoformat()
             }
         
         self.analytics_data["user_engagement"][user_id]["total_interactions"] += 1
-        self.analytics_data["user_engagement"][user_id]["last_active"] = datetime.now().isoformat()
+        self.analytics_data["user_engagement"][user_id]["last_active"] = now.isoformat()
     
+    def _track_sketches(self, user_id, item_name, category, today):
+        """تحديث الهياكل التقريبية، كل خطوة O(1)"""
+        self.item_sketch.add(item_name)
+        self.heavy_hitters.add(item_name)
+
+        if category is None:
+            category = self._item_category(item_name)
+        if category is not None:
+            self.category_sketch.add(category)
+            self.categories.add(category)
+
+        if today not in self.daily_active:
+            self.daily_active[today] = HyperLogLog()
+            for day in sorted(self.daily_active)[:-self.retention_days]:
+                del self.daily_active[day]
+        self.daily_active[today].add(user_id)
+
+        # المستخدم يدخل مستوى أعلى عند تجاوز عدده التقديري للحد
+        interactions = self.user_sketch.add(user_id)
+        self.all_users.add(user_id)
+        if interactions > MEDIUM_ENGAGEMENT:
+            self.medium_users.add(user_id)
+        if interactions > HIGH_ENGAGEMENT:
+            self.high_users.add(user_id)
+
+    def _item_category(self, item_name):
+        database = getattr(self.recommender, "database", None)
+        info = database.items.get(item_name) if database is not None else None
+        return info["category"] if info else None
+
+    def get_daily_active_users(self, day=None):
+        """عدد المستخدمين النشطين في يوم (تقريبي في وضع التقدير)"""
+        day = day or self.clock().strftime("%Y-%m-%d")
+        if self.sketch:
+            hll = self.daily_active.get(day)
+            return hll.count() if hll else 0
+        return sum(1 for data in self.analytics_data["user_engagement"].values()
+                   if data["last_active"].startswith(day))
+
+    def get_heavy_hitters(self, limit=10):
+        """أكثر العناصر تفاعلاً منذ البداية: (العنصر، العدد، أقصى خطأ)"""
+        if not self.sketch:
+            raise RuntimeError("Heavy hitters require sketch mode")
+        return self.heavy_hitters.top(limit)
+
     def get_popular_items(self, days=7):
-        """الحصول على العناصر الشائعة خلال فترة محددة"""
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=days)
-        
-        item_counts = defaultdict(int)
-        
-        for uid, user in self.recommender.users.items():
-            for event in user.events:
-                event_date = datetime.now()  # في النسخة الحقيقية، يتم تخزين التاريخ
-                if start_date <= event_date <= end_date:
-                    item_counts[event["item"]] += 1
-        
-        return sorted(item_counts.items(), key=lambda x: x[1], reverse=True)[:10]
+        """الحصول على العناصر الشائعة خلال آخر days يوماً (من التفاعلات المتتبعة)"""
+        return self.item_counts.top(self.clock().toordinal(), days)
     
-    def export_analytics(self, filename="analytics_report.json"):
-        """تصدير البيانات التحليلية"""
-        report = {
+    def _refresh_event_totals(self):
+        """إضافة أحداث المستخدمين الجديدة منذ آخر مرة إلى المجاميع الجارية"""
+        for user_id, user in self.recommender.users.items():
+            events = user.events
+            offset = self._event_offsets.get(user_id, 0)
+            if len(events) <= offset:
+                continue
+            category_ids = getattr(events, "category_ids", None)
+            if category_ids is not None:
+                # EventStore: العد مباشرة على عمود التصنيفات
+                for category_id, count in Counter(category_ids[offset:]).items():
+                    self._category_totals[CATEGORIES.lookup(category_id)] += count
+            else:
+                for event in events[offset:]:
+                    self._category_totals[event["category"]] += 1
+            self._total_interactions += len(events) - offset
+            self._event_offsets[user_id] = len(events)
+
+    def build_report(self):
+        """ملخص التقرير (المجاميع تُحدَّث تدريجياً)"""
+        if not self.sketch:
+            self._refresh_event_totals()
+        return {
             "generated_at": datetime.now().isoformat(),
             "total_users": len(self.recommender.users),
-            "total_interactions": sum(len(user.events) for user in self.recommender.users.values()),
+            "total_interactions": self._total_interactions,
             "popular_categories": self._get_category_stats(),
             "user_engagement_stats": self._get_engagement_stats()
         }
-        
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(report, f, indent=2, ensure_ascii=False)
-        
+
+    def export_analytics(self, filename="analytics_report.json", format="json"):
+        """
+        تصدير البيانات التحليلية
+        format="ndjson" يكتب سجلاً لكل سطر بشكل متدفق (ملخص، تصنيفات، تفاعلات يومية، مستخدمين)
+        والضغط gzip يُفعَّل عندما ينتهي اسم الملف بـ .gz
+        """
+        if self.sketch:
+            self._total_interactions = self.item_sketch.total
+        report = self.build_report()
+
+        with _open_output(filename) as f:
+            if format == "json":
+                json.dump(report, f, indent=2, ensure_ascii=False)
+            elif format == "ndjson":
+                self._write_ndjson(f, report)
+            else:
+                raise ValueError(f"Unknown export format: {format}")
+
         return report
-    
+
+    def _write_ndjson(self, f, report):
+        def write(record):
+            f.write(json.dumps(record, ensure_ascii=False))
+            f.write("\n")
+
+        write({"type": "summary", **report})
+        for day, actions in self.analytics_data["daily_interactions"].items():
+            for action, count in actions.items():
+                write({"type": "daily", "day": day, "action": action, "count": count})
+        for user_id, data in self.analytics_data["user_engagement"].items():
+            write({"type": "user", "user_id": user_id, **data})
+
+    def export_daily_interactions(self, filename="daily_interactions.parquet"):
+        """جدول التفاعلات اليومية (اليوم، الفعل، العدد) بصيغة Parquet، يتطلب pyarrow"""
+        if pa is None:
+            raise RuntimeError("pyarrow is required for Parquet export")
+        rows = [(day, action, count)
+                for day, actions in self.analytics_data["daily_interactions"].items()
+                for action, count in actions.items()]
+        table = pa.table({
+            "day": [row[0] for row in rows],
+            "action": [row[1] for row in rows],
+            "count": pa.array([row[2] for row in rows], type=pa.int64())
+        })
+        pq.write_table(table, filename)
+        return len(rows)
+
     def _get_category_stats(self):
         """إحصاءات التصنيفات"""
-        category_counts = defaultdict(int)
-        
-        for user in self.recommender.users.values():
-            for event in user.events:
-                category_counts[event["category"]] += 1
-        
-        return dict(category_counts)
+        if self.sketch:
+            # تقدير زائد بحد أقصى category_sketch.error_bound()
+            return {category: self.category_sketch.estimate(category) for category in sorted(self.categories)}
+
+        self._refresh_event_totals()
+        return dict(self._category_totals)
     
     def _get_engagement_stats(self):
         """إحصاءات تفاعل المستخدمين"""
@@ -80,13 +295,22 @@ class AnalyticsDashboard:
             "medium_engagement": 0,
             "low_engagement": 0
         }
+
+        if self.sketch:
+            # تقريبي: خطأ HyperLogLog ≈ 1.6%، وعدّ Count-Min قد يرفع المستخدم مبكراً
+            high = self.high_users.count()
+            medium = max(self.medium_users.count() - high, 0)
+            stats["high_engagement"] = high
+            stats["medium_engagement"] = medium
+            stats["low_engagement"] = max(self.all_users.count() - high - medium, 0)
+            return stats
         
         for user_id, data in self.analytics_data["user_engagement"].items():
             interactions = data["total_interactions"]
             
-            if interactions > 20:
+            if interactions > HIGH_ENGAGEMENT:
                 stats["high_engagement"] += 1
-            elif interactions > 5:
+            elif interactions > MEDIUM_ENGAGEMENT:
                 stats["medium_engagement"] += 1
             else:
                 stats["low_engagement"] += 1
@@ -1,32 +1,46 @@
-import hashlib
-import json
+import atexit
 import os
 from datetime import datetime
 
+from passwords import PasswordHasher
+from user_store import ShardedJsonUserStore, SQLiteUserStore, WriteBehindWriter
+
 class AuthenticationSystem:
-    def __init__(self, users_file="users_data.json"):
+    def __init__(self, users_file="users_data.json", store=None, backend="sqlite",
+                 flush_interval=1.0, max_dirty=100, hasher=None):
         self.users_file = users_file
-        self.users = self.load_users()
+        self.backend = backend
+        # scrypt بملح داخل مجمع عمال محدود (انظر passwords.py)
+        self.hasher = hasher or PasswordHasher()
+        self.users = store if store is not None else self.load_users()
         self.current_user = None
+        # تحديثات الدخول والملف الشخصي تُكتب في الخلفية، والمعلق يُكتب عند الإغلاق
+        self.writer = WriteBehindWriter(self.users, interval=flush_interval, max_dirty=max_dirty)
+        atexit.register(self.close)
     
     def load_users(self):
-        """تحميل المستخدمين من ملف JSON"""
-        if os.path.exists(self.users_file):
-            try:
-                with open(self.users_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except:
-                return {}
-        return {}
+        """
+        فتح مخزن المستخدمين (تُنقل بيانات ملف JSON القديم إليه أول مرة)
+        backend="sqlite": ملف users_data.db، backend="sharded": مجلد users_data/
+        """
+        base = os.path.splitext(self.users_file)[0]
+        if self.backend == "sharded":
+            return ShardedJsonUserStore(base, legacy_json=self.users_file)
+        if self.backend == "sqlite":
+            return SQLiteUserStore(base + ".db", legacy_json=self.users_file)
+        raise ValueError(f"Unknown user store backend: {self.backend}")
     
     def save_users(self):
-        """حفظ المستخدمين في ملف JSON"""
-        with open(self.users_file, 'w', encoding='utf-8') as f:
-            json.dump(self.users, f, indent=2, ensure_ascii=False)
+        """كتابة التحديثات المؤجلة الآن"""
+        self.writer.flush()
+
+    def close(self):
+        self.writer.close()
+        self.hasher.close()
     
     def hash_password(self, password):
         """تشفير كلمة المرور"""
-        return hashlib.sha256(password.encode()).hexdigest()
+        return self.hasher.hash(password)
     
     def register(self, username, password, email=None):
         """تسجيل مستخدم جديد"""
@@ -49,7 +63,6 @@ class AuthenticationSystem:
             }
         }
         
-        self.save_users()
         return True, f"تم تسجيل {username} بنجاح! (ID: {user_id})"
     
     def login(self, username, password):
@@ -59,12 +72,34 @@ class AuthenticationSystem:
         
         user = self.users[username]
         
-        if user["password_hash"] != self.hash_password(password):
+        if not self.hasher.verify(password, user["password_hash"]):
             return False, "كلمة المرور غير صحيحة!"
         
-        # تحديث وقت آخر دخول
-        user["last_login"] = datetime.now().isoformat()
-        self.save_users()
+        new_hash = self.hasher.hash(password) if self.hasher.needs_rehash(user["password_hash"]) else None
+        return self._complete_login(username, user, new_hash)
+    
+    async def login_async(self, username, password):
+        """تسجيل الدخول بدون حجز حلقة asyncio أثناء التحقق من كلمة المرور"""
+        if username not in self.users:
+            return False, "اسم المستخدم غير موجود!"
+        
+        user = self.users[username]
+        
+        if not await self.hasher.verify_async(password, user["password_hash"]):
+            return False, "كلمة المرور غير صحيحة!"
+        
+        new_hash = await self.hasher.hash_async(password) if self.hasher.needs_rehash(user["password_hash"]) else None
+        return self._complete_login(username, user, new_hash)
+    
+    def _complete_login(self, username, user, new_hash=None):
+        # تحديث وقت آخر دخول، واستبدال التجزئة القديمة إن وجدت
+        # (السجل يُقرأ من جديد: قد يكون جزؤه أُزيل من الذاكرة أثناء التحقق)
+        with self.users.lock:
+            user = self.users[username]
+            user["last_login"] = datetime.now().isoformat()
+            if new_hash:
+                user["password_hash"] = new_hash
+            self.writer.mark_dirty(username)
         
         self.current_user = {
             "username": username,
@@ -87,12 +122,13 @@ class AuthenticationSystem:
         if username not in self.users:
             return False, "المستخدم غير موجود"
         
-        if "profile" in kwargs:
-            self.users[username]["profile"].update(kwargs["profile"])
-        else:
-            self.users[username]["profile"].update(kwargs)
+        with self.users.lock:
+            if "profile" in kwargs:
+                self.users[username]["profile"].update(kwargs["profile"])
+            else:
+                self.users[username]["profile"].update(kwargs)
+            self.writer.mark_dirty(username)
         
-        self.save_users()
         return True, "تم تحديث الملف الشخصي"
     
     def get_all_users(self):
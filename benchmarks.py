@@ -0,0 +1,306 @@
+"""
+قياسات أداء محلية (بدون اتصال) لمكونات النظام
+الاستخدام: python benchmarks.py <اسم القياس>
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _print_latency_report(name, latencies, elapsed):
+    print(f"{name:<14} "
+          f"p50={_percentile(latencies, 50) * 1000:7.2f}ms  "
+          f"p99={_percentile(latencies, 99) * 1000:7.2f}ms  "
+          f"mean={statistics.mean(latencies) * 1000:7.2f}ms  "
+          f"rps={len(latencies) / elapsed:9.1f}")
+
+
+# --- 1. مسار التوصية المتزامن مقابل غير المتزامن ---
+
+def _seed_firestore(db, num_products, num_users):
+    categories = ["tech", "fashion", "home", "sports", "beauty"]
+    for i in range(num_products):
+        db.collection("products").document(f"P{i:05d}").set({
+            "name": f"Product {i}",
+            "category": random.choice(categories),
+            "price": round(random.uniform(5, 1500), 2),
+            "rating": round(random.uniform(1, 5), 1),
+            "updated_at": i
+        })
+    for i in range(num_users):
+        db.collection("users").document(f"user_{i}").set({
+            "interests": random.sample(categories, 2)
+        })
+
+
+def bench_endpoints(num_products=2000, num_users=200, num_requests=2000,
+                    concurrency=200, latency=0.005, threadpool=40):
+    """
+    مقارنة معالج /recommend في main.py المتزامن (داخل threadpool بحجم Starlette الافتراضي)
+    مع المعالج غير المتزامن بالسحب الدوري وبالمستمع، على FakeFirestore بزمن شبكة ثابت لكل طلب
+    """
+    from fake_firestore import FakeFirestore
+    from product_catalog import AsyncCatalogSnapshot, CatalogSnapshot
+    import recommender_ai
+
+    db = FakeFirestore(latency=0)
+    _seed_firestore(db, num_products, num_users)
+    db.latency = latency
+    async_db = db.async_client()
+
+    # كتالوج بمستمع على العميل المتزامن (كما في main.py)، وكتالوج بالسحب كل 50ms على AsyncClient
+    recommender_ai.get_catalog(db, CatalogSnapshot)
+    recommender_ai.get_catalog(async_db, AsyncCatalogSnapshot, max_staleness=0.05)
+
+    user_ids = [f"user_{random.randrange(num_users)}" for _ in range(num_requests)]
+
+    def sync_handler(user_id):
+        # شكل المعالج القديم في main.py: دالة متزامنة داخل threadpool
+        return recommender_ai.get_recommendations(user_id, db)
+
+    async def run_sync():
+        loop = asyncio.get_running_loop()
+        executor = ThreadPoolExecutor(max_workers=threadpool)
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies = []
+
+        async def one(user_id):
+            async with semaphore:
+                start = time.perf_counter()
+                await loop.run_in_executor(executor, sync_handler, user_id)
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(u) for u in user_ids))
+        elapsed = time.perf_counter() - start
+        executor.shutdown()
+        return latencies, elapsed
+
+    async def run_async(listener_db=None):
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies = []
+
+        async def one(user_id):
+            async with semaphore:
+                start = time.perf_counter()
+                await recommender_ai.get_recommendations_async(user_id, async_db, listener_db)
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(u) for u in user_ids))
+        return latencies, time.perf_counter() - start
+
+    print(f"products={num_products} users={num_users} requests={num_requests} "
+          f"concurrency={concurrency} rpc_latency={latency * 1000:.1f}ms")
+    with contextlib.redirect_stdout(io.StringIO()):
+        sync_result = asyncio.run(run_sync())
+        listener_result = asyncio.run(run_async(db))
+        poll_result = asyncio.run(run_async())
+    _print_latency_report("sync def", *sync_result)
+    _print_latency_report("async listener", *listener_result)
+    _print_latency_report("async poll", *poll_result)
+
+
+# --- 2. تحديثات الشعبية المتلاشية مع نمو الكتالوج ---
+
+def bench_popularity(sizes=(1_000, 10_000, 100_000, 1_000_000), num_updates=200_000,
+                     num_categories=50):
+    """
+    معدل تحديث الشعبية (DecayingScores + PopularityIndex كما في
+    ContentDatabase.update_popularity) لأحجام كتالوج متزايدة
+    """
+    from popularity import DecayingScores, PopularityIndex
+
+    increments = (0.01, 0.05, 0.1)
+    for size in sizes:
+        now = [0.0]
+        scores = DecayingScores(half_life=3600, clock=lambda: now[0])
+        index = PopularityIndex()
+        scores.on_rescale = index.rescale
+        categories = [f"cat{i % num_categories}" for i in range(size)]
+
+        start = time.perf_counter()
+        for item in range(size):
+            index.update(item, categories[item], scores.set(item, 0.5), item)
+        load_time = time.perf_counter() - start
+
+        items = [random.randrange(size) for _ in range(num_updates)]
+        amounts = [random.choice(increments) for _ in range(num_updates)]
+        start = time.perf_counter()
+        for item, amount in zip(items, amounts):
+            now[0] += 0.05  # الزمن يتقدم بين التحديثات (التلاشي فعال أثناء القياس)
+            index.update(item, categories[item], scores.add(item, amount), item)
+        elapsed = time.perf_counter() - start
+
+        top = index.top(10)
+        print(f"items={size:>9,}  load={load_time:6.2f}s  "
+              f"updates/s={num_updates / elapsed:10,.0f}  "
+              f"top={top[:3]}")
+
+
+# --- 3. التحقق من كلمات المرور (scrypt/PBKDF2) حسب عدد العمال ---
+
+def bench_logins(num_logins=100, schemes=("scrypt", "pbkdf2_sha256")):
+    """عدد عمليات الدخول في الثانية لكل نواة مع أحجام مختلفة لمجمع التحقق"""
+    import os
+    from passwords import PasswordHasher, hash_password
+
+    cores = os.cpu_count() or 1
+    worker_counts = sorted({1, 2, max(cores // 2, 1), cores})
+    print(f"cores={cores} logins={num_logins}")
+    for scheme in schemes:
+        stored = hash_password("correct horse", scheme)
+        for workers in worker_counts:
+            hasher = PasswordHasher(scheme, workers=workers)
+
+            async def run():
+                await asyncio.gather(*(hasher.verify_async("correct horse", stored)
+                                       for _ in range(num_logins)))
+
+            start = time.perf_counter()
+            asyncio.run(run())
+            elapsed = time.perf_counter() - start
+            hasher.close()
+            rate = num_logins / elapsed
+            print(f"{scheme:<14} workers={workers:<3} logins/s={rate:8.1f}  "
+                  f"per core={rate / min(workers, cores):7.1f}")
+
+
+# --- 4. المزاج: الكلمات المفتاحية مقابل الكلمات المفتاحية + النموذج ---
+
+# لكل مزاج: (عبارات في القاموس، عبارات خارجه للتدريب، عبارات خارجه للاختبار فقط)
+_MOOD_PHRASES = {
+    "سعيد": (["مبسوط", "سعيد", "فرحان", "مسرورة"], ["مستمتع", "رايق", "ممتنة"], ["متحمس", "يوم رائع"]),
+    "حزين": (["زعلان", "حزينة", "تعيس", "محبط"], ["مكتئب", "مكسور الخاطر", "ضايق صدري"], ["وحيد", "ابكي"]),
+    "مرهق": (["تعبان", "مرهقة", "متعب", "إرهاق"], ["منهك", "نعسان", "ما نمت"], ["مستنزف", "خلصت طاقتي"]),
+    "غاضب": (["غاضب", "عصبية", "منزعج"], ["معصب", "مستفز", "طفشان"], ["ناقم", "فاض بي"]),
+    "محايد": ([], [], []),
+}
+_MOOD_FILLER = ["اليوم", "انا", "كنت", "في", "العمل", "مع", "اصدقائي", "بعد", "الدوام",
+                "الجو", "الطريق", "البيت", "شوي", "جدا", "والله", "حاليا", "من", "الصبح"]
+# كلمات حشو تظهر في الاختبار فقط
+_MOOD_TEST_FILLER = ["السيارة", "الاجتماع", "المساء", "اخوي", "القهوة", "الجامعة"]
+
+
+def _mood_examples(count, rng, held_out=False):
+    """نصوص مصطنعة نصف عباراتها خارج القاموس (عبارات الاختبار لا تظهر في التدريب)"""
+    texts, labels = [], []
+    moods = list(_MOOD_PHRASES)
+    filler = _MOOD_FILLER + _MOOD_TEST_FILLER if held_out else _MOOD_FILLER
+    for _ in range(count):
+        mood = rng.choice(moods)
+        words = [rng.choice(filler) for _ in range(rng.randint(3, 12))]
+        known, train_unknown, test_unknown = _MOOD_PHRASES[mood]
+        if known:
+            phrase = rng.choice(known if rng.random() < 0.5 else test_unknown if held_out else train_unknown)
+            words.insert(rng.randint(0, len(words)), phrase)
+        texts.append(" ".join(words))
+        labels.append(mood)
+    return texts, labels
+
+
+def bench_mood(num_train=20_000, num_test=20_000):
+    """
+    دقة وسرعة MoodDetector بالكلمات المفتاحية فقط، ومع نموذج mood_model.
+    عبارات الاختبار خارج القاموس لم يرها النموذج في التدريب، وتُطبع الدقة
+    أيضاً على النصوص التي لا تطابق فيها أي كلمة مفتاحية (حيث يعمل النموذج)
+    """
+    import tempfile
+    from mood_detector import NEUTRAL_MOOD, MoodDetector
+    from mood_model import train_mood_model
+
+    rng = random.Random(0)
+    train_texts, train_labels = _mood_examples(num_train, rng)
+    test_texts, test_labels = _mood_examples(num_test, rng, held_out=True)
+    keyword_misses = [i for i, mood in enumerate(MoodDetector().detect_batch(test_texts)) if mood == NEUTRAL_MOOD]
+
+    with tempfile.TemporaryDirectory() as model_dir:
+        start = time.perf_counter()
+        train_mood_model(train_texts, train_labels, model_dir)
+        print(f"train={num_train} test={num_test} keyword-misses={len(keyword_misses)} "
+              f"training={time.perf_counter() - start:.1f}s")
+
+        for name, detector in [("keywords", MoodDetector()),
+                               ("keywords+model", MoodDetector(model_dir=model_dir))]:
+            start = time.perf_counter()
+            predicted = detector.detect_batch(test_texts)
+            elapsed = time.perf_counter() - start
+            accuracy = sum(p == t for p, t in zip(predicted, test_labels)) / len(test_labels)
+            missed = sum(predicted[i] == test_labels[i] for i in keyword_misses) / max(len(keyword_misses), 1)
+            print(f"{name:<15} accuracy={accuracy:6.1%}  on-misses={missed:6.1%}  "
+                  f"msgs/s={len(test_texts) / elapsed:10,.0f}")
+
+
+# --- 5. تحليل المصفوفة: زمن التدريب وزمن التوصية ---
+
+def bench_mf(num_users=100_000, num_items=50_000, per_user=30, num_groups=500,
+             factors=64, num_queries=2000):
+    """
+    TruncatedSVD على تفاعلات مصطنعة لها بنية مجموعات (كل مجموعة تفضل عناصر معينة)
+    ثم زمن recommend لكل مستخدم والنسبة من التوصيات داخل مجموعته
+    """
+    import tempfile
+    import numpy as np
+    from scipy import sparse
+    from matrix_factorization import MFRecommender, train_model
+
+    rng = np.random.default_rng(0)
+    group_size = num_items // num_groups
+    groups = rng.integers(0, num_groups, num_users)
+    rows = np.repeat(np.arange(num_users), per_user)
+    in_group = rng.random(len(rows)) < 0.8
+    cols = np.where(in_group,
+                    groups[rows] * group_size + rng.integers(0, group_size, len(rows)),
+                    rng.integers(0, num_items, len(rows)))
+    values = rng.choice([1.0, 2.0, 3.0], len(rows))
+    matrix = sparse.csr_matrix((values, (rows, cols)), shape=(num_users, num_items))
+    user_ids = [f"user_{i}" for i in range(num_users)]
+    item_names = [str(i) for i in range(num_items)]
+    print(f"users={num_users:,} items={num_items:,} nnz={matrix.nnz:,} factors={factors}")
+
+    with tempfile.TemporaryDirectory() as model_dir:
+        start = time.perf_counter()
+        train_model(matrix, user_ids, item_names, model_dir, factors)
+        print(f"training={time.perf_counter() - start:.1f}s")
+
+        start = time.perf_counter()
+        model = MFRecommender(model_dir)
+        print(f"load={(time.perf_counter() - start) * 1000:.0f}ms")
+
+        latencies, hits = [], 0
+        for row in rng.integers(0, num_users, num_queries):
+            start = time.perf_counter()
+            recommended = model.recommend(user_ids[row], 10)
+            latencies.append(time.perf_counter() - start)
+            hits += sum(int(item) // group_size == groups[row] for item in recommended)
+        print(f"recommend p50={_percentile(latencies, 50) * 1000:.2f}ms  "
+              f"p99={_percentile(latencies, 99) * 1000:.2f}ms  "
+              f"in-group={hits / (10 * num_queries):.1%}")
+        del model  # تحرير ملف item_factors.npy المفتوح بـ mmap قبل حذف المجلد
+
+
+BENCHMARKS = {
+    "endpoints": bench_endpoints,
+    "logins": bench_logins,
+    "mf": bench_mf,
+    "mood": bench_mood,
+    "popularity": bench_popularity,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Flowmart AI benchmarks")
+    parser.add_argument("name", choices=sorted(BENCHMARKS))
+    args = parser.parse_args()
+    BENCHMARKS[args.name]()
@@ -0,0 +1,139 @@
+"""
+توصيات بالتصفية التعاونية (عنصر-عنصر) من سلوك المستخدمين
+- مصفوفة متفرقة CSR (مستخدم × عنصر) تُبنى مباشرة من أعمدة EventStore
+  بنفس أوزان get_interaction_score (view=1، like=2، share=3، watch=الدقائق)
+- تشابه جيب التمام بين الأعمدة بضرب مصفوفات متفرقة على دفعات من العناصر
+- لكل عنصر أفضل K جيران فقط، والتوصية لمستخدم = صفه × مصفوفة الجيران
+"""
+import numpy as np
+from scipy import sparse
+
+from user_behavior import ACTION_WEIGHTS, ACTIONS, ITEMS
+
+
+def _action_weights():
+    """وزن كل رقم فعل في ACTIONS (watch = 0 هنا، وزنه من المدة)"""
+    return np.array([ACTION_WEIGHTS.get(action, 0) for action in ACTIONS.values], dtype=np.float64)
+
+
+def interaction_matrix(users):
+    """
+    users: {user_id: UserBehavior}
+    يرجع (مصفوفة CSR بحجم مستخدم × عنصر، قائمة user_id بترتيب الصفوف)
+    الأعمدة هي أرقام العناصر في ITEMS، والتفاعلات المكررة تُجمع
+    """
+    weights = _action_weights()
+    watch_id = ACTIONS.ids.get("watch", -1)
+
+    user_ids, rows, cols, values = [], [], [], []
+    for row, (user_id, user) in enumerate(users.items()):
+        user_ids.append(user_id)
+        events = user.events
+        if not len(events):
+            continue
+        items = np.frombuffer(events.item_ids, dtype=np.uint32)
+        actions = np.frombuffer(events.action_ids, dtype=np.uint32)
+        durations = np.nan_to_num(np.frombuffer(events.durations, dtype=np.float64))
+        scores = np.where(actions == watch_id, durations / 60, weights[actions])
+        rows.append(np.full(len(items), row, dtype=np.int32))
+        cols.append(items)
+        values.append(scores)
+
+    shape = (len(user_ids), len(ITEMS))
+    if not rows:
+        return sparse.csr_matrix(shape), user_ids
+    matrix = sparse.csr_matrix(
+        (np.concatenate(values), (np.concatenate(rows), np.concatenate(cols))), shape=shape
+    )
+    matrix.eliminate_zeros()
+    return matrix, user_ids
+
+
+def _top_k_rows(similarity, k):
+    """أبقِ أفضل k قيم في كل صف من مصفوفة CSR"""
+    similarity = similarity.tocsr()
+    indptr = [0]
+    indices, data = [], []
+    for row in range(similarity.shape[0]):
+        start, end = similarity.indptr[row], similarity.indptr[row + 1]
+        row_data = similarity.data[start:end]
+        row_indices = similarity.indices[start:end]
+        if len(row_data) > k:
+            keep = np.argpartition(-row_data, k - 1)[:k]
+            row_data, row_indices = row_data[keep], row_indices[keep]
+        data.append(row_data)
+        indices.append(row_indices)
+        indptr.append(indptr[-1] + len(row_data))
+    return sparse.csr_matrix(
+        (np.concatenate(data) if data else [], np.concatenate(indices) if indices else [], indptr),
+        shape=similarity.shape
+    )
+
+
+class ItemCFEngine:
+    def __init__(self, neighbors=50, block_size=2048):
+        self.num_neighbors = neighbors
+        self.block_size = block_size
+        self.matrix = None
+        self.user_ids = []
+        self.rows = {}
+        self.neighbors = None  # CSR (عنصر × عنصر): أفضل K جيران لكل عنصر
+
+    def fit(self, users):
+        """بناء المصفوفة وجداول الجيران من {user_id: UserBehavior}"""
+        self.matrix, self.user_ids = interaction_matrix(users)
+        self.rows = {user_id: row for row, user_id in enumerate(self.user_ids)}
+        self.neighbors = self.build_neighbors(self.matrix)
+        return self
+
+    def build_neighbors(self, matrix):
+        """تشابه جيب التمام بين العناصر، دفعة من الأعمدة في كل مرة حتى تبقى الذاكرة محدودة"""
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=0)).ravel())
+        norms[norms == 0] = 1.0
+        normalized = sparse.csr_matrix(matrix.multiply(1.0 / norms[np.newaxis, :]))
+        item_users = normalized.T.tocsr()  # عنصر × مستخدم
+
+        blocks = []
+        for start in range(0, item_users.shape[0], self.block_size):
+            block = (item_users[start:start + self.block_size] @ normalized).tocsr()  # دفعة × كل العناصر
+            # العنصر ليس جاراً لنفسه: تصفير القطر مباشرة في بيانات CSR
+            row_items = np.repeat(np.arange(start, start + block.shape[0]), np.diff(block.indptr))
+            block.data[block.indices == row_items] = 0
+            block.eliminate_zeros()
+            blocks.append(_top_k_rows(block, self.num_neighbors))
+        if not blocks:
+            return sparse.csr_matrix((0, 0))
+        return sparse.vstack(blocks, format="csr")
+
+    def recommend(self, user_id, num=10, exclude_seen=True):
+        """أفضل num عناصر لمستخدم: مجموع (وزن تفاعله مع عنصر × تشابه الجار)"""
+        row = self.rows.get(user_id)
+        if row is None or self.neighbors is None:
+            return []
+        user_row = self.matrix[row]
+        if user_row.nnz == 0:
+            return []
+        scores = (user_row @ self.neighbors).toarray().ravel()
+        if exclude_seen:
+            scores[user_row.indices] = 0
+        return [ITEMS.lookup(i) for i in _top_positions(scores, num)]
+
+    def similar_items(self, item_name, num=10):
+        item_id = ITEMS.ids.get(item_name)
+        if item_id is None or self.neighbors is None or item_id >= self.neighbors.shape[0]:
+            return []
+        start, end = self.neighbors.indptr[item_id], self.neighbors.indptr[item_id + 1]
+        scores = np.zeros(self.neighbors.shape[1])
+        scores[self.neighbors.indices[start:end]] = self.neighbors.data[start:end]
+        return [ITEMS.lookup(i) for i in _top_positions(scores, num)]
+
+
+def _top_positions(scores, num):
+    """أفضل num مواقع بدرجة موجبة، التعادل يُكسر بالرقم الأصغر"""
+    candidates = np.flatnonzero(scores > 0)
+    if len(candidates) > num:
+        selected = np.argpartition(-scores[candidates], num - 1)[:num]
+        cutoff = scores[candidates[selected]].min()
+        candidates = candidates[scores[candidates] >= cutoff]
+    order = np.lexsort((candidates, -scores[candidates]))
+    return candidates[order[:num]]
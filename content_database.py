@@ -1,6 +1,54 @@
+import time
+from mood_index import MoodItemIndex
+from popularity import DEFAULT_HALF_LIFE, DecayingScores, PopularityIndex
+from search_index import SearchIndex
+
+try:
+    from similarity_engine import ItemSimilarityEngine
+except ImportError:  # numpy/scipy غير مثبتة
+    ItemSimilarityEngine = None
+
+class _ItemIndex:
+    """فهرس قيمة -> عناصر، يحافظ على ترتيب العناصر في القاعدة"""
 
-class ContentDatabase:
     def __init__(self):
+        self._postings = {}  # القيمة -> {العنصر: رقم ترتيبه}
+        self._unsorted = set()
+
+    def add(self, key, item, order):
+        postings = self._postings.setdefault(key, {})
+        if postings and order < next(reversed(postings.values())):
+            self._unsorted.add(key)
+        postings[item] = order
+
+    def remove(self, key, item):
+        postings = self._postings.get(key)
+        if postings is None:
+            return
+        postings.pop(item, None)
+        if not postings:
+            del self._postings[key]
+            self._unsorted.discard(key)
+
+    def get(self, key):
+        """العناصر بترتيبها في القاعدة (dict فارغ إذا لم توجد)"""
+        if key in self._unsorted:
+            postings = self._postings[key]
+            self._postings[key] = dict(sorted(postings.items(), key=lambda x: x[1]))
+            self._unsorted.discard(key)
+        return self._postings.get(key, {})
+
+    def count(self, key):
+        return len(self._postings.get(key, ()))
+
+    def keys(self):
+        return list(self._postings)
+
+    def __len__(self):
+        return len(self._postings)
+
+class ContentDatabase:
+    def __init__(self, half_life=DEFAULT_HALF_LIFE, clock=time.time):
         self.items = {
             "Python Tutorial": {
                 "category": "Programming",
@@ -174,76 +222,217 @@ class ContentDatabase:
             self.items[item]["likes"] = 0
             self.items[item]["popularity"] = 0.5  # درجة شعبية ابتدائية
 
+        # محرك التشابه المتجه (يُبنى عند أول طلب)
+        self._similarity = None
+        # فهرس المزاج -> عناصر (يُبنى عند أول طلب)
+        self._mood_index = None
+        # فهرس البحث النصي
+        self._search = SearchIndex()
+        # فهارس التصنيفات والوسوم (تُحدَّث مع كل إضافة وحذف)
+        self._by_category = _ItemIndex()
+        self._by_tag = _ItemIndex()
+        # الشعبية: درجات متلاشية زمنياً + فهرس مرتب على القيم الخام
+        self._decay = DecayingScores(half_life, clock)
+        self._decay.on_rescale = self._on_popularity_rescale
+        self._popular = PopularityIndex()
+        self._indexed = {}  # العنصر -> (التصنيف، الوسوم) كما هي في الفهارس
+        self._order = {}  # ترتيب إدخال العناصر
+        self._next_order = 0
+
+        # كل العناصر تبدأ بنفس اللحظة حتى لا يختلف معامل النمو بينها
+        self._decay.set_many((item, info["popularity"]) for item, info in self.items.items())
+        for item in self.items:
+            self._on_item_changed(item)
+
+    def add_item(self, item_name, info):
+        """إضافة عنصر جديد (أو استبدال عنصر موجود) مع تحديث الفهارس"""
+        info = dict(info)
+        info.setdefault("tags", [])
+        info.setdefault("views", 0)
+        info.setdefault("likes", 0)
+        info.setdefault("popularity", 0.5)
+        self.items[item_name] = info
+        self._on_item_changed(item_name, reset_popularity=True)
+        return True
+
+    def update_item(self, item_name, **changes):
+        """تعديل بيانات عنصر (التصنيف، الوسوم، ...) مع تحديث الفهارس"""
+        if item_name not in self.items:
+            return False
+        self.items[item_name].update(changes)
+        self._on_item_changed(item_name, reset_popularity="popularity" in changes)
+        return True
+
+    def remove_item(self, item_name):
+        """حذف عنصر مع تحديث الفهارس"""
+        if item_name not in self.items:
+            return False
+        del self.items[item_name]
+        self._unindex(item_name)
+        del self._order[item_name]
+        self._decay.remove(item_name)
+        self._search.remove(item_name)
+        if self._similarity is not None:
+            self._similarity.remove_item(item_name)
+        if self._mood_index is not None:
+            self._mood_index.remove_item(item_name)
+        return True
+
+    def _on_item_changed(self, item_name, reset_popularity=False):
+        info = self.items[item_name]
+        if item_name not in self._order:
+            self._order[item_name] = self._next_order
+            self._next_order += 1
+        order = self._order[item_name]
+
+        self._unindex(item_name)
+        tags = list(dict.fromkeys(info["tags"]))
+        self._by_category.add(info["category"], item_name, order)
+        for tag in tags:
+            self._by_tag.add(tag, item_name, order)
+        self._indexed[item_name] = (info["category"], tags)
+        if reset_popularity:
+            self._decay.set(item_name, info["popularity"])
+        raw = self._decay.raw(item_name)
+        self._popular.update(item_name, info["category"], raw, order)
+
+        self._search.update(item_name, info)
+        if self._similarity is not None:
+            self._similarity.update_item(item_name, info, popularity=raw)
+        if self._mood_index is not None:
+            self._mood_index.update_item(item_name, info, raw, order)
+
+    def _unindex(self, item_name):
+        if item_name not in self._indexed:
+            return
+        category, tags = self._indexed.pop(item_name)
+        self._by_category.remove(category, item_name)
+        for tag in tags:
+            self._by_tag.remove(tag, item_name)
+        self._popular.remove(item_name)
+
     def get_items_by_category(self, category):
         """الحصول على عناصر حسب التصنيف"""
-        return [
-            item for item, info in self.items.items()
-            if info["category"] == category
-        ]
+        return list(self._by_category.get(category))
     
     def get_items_by_tag(self, tag):
         """الحصول على عناصر حسب الوسم"""
-        return [
-            item for item, info in self.items.items()
-            if tag in info["tags"]
-        ]
+        return list(self._by_tag.get(tag))
+
+    def get_items_by_tags(self, tags, mode="and"):
+        """عناصر تحمل كل الوسوم (and) أو أياً منها (or)"""
+        postings = [self._by_tag.get(tag) for tag in tags]
+        if not postings:
+            return []
+
+        if mode == "and":
+            postings.sort(key=len)
+            matches = [item for item in postings[0] if all(item in p for p in postings[1:])]
+            return matches
+        elif mode == "or":
+            matches = {}
+            for p in postings:
+                matches.update(p)
+            return sorted(matches, key=matches.get)
+        raise ValueError(f"Unknown mode: {mode}")
+
+    def get_category_counts(self):
+        """عدد العناصر في كل تصنيف"""
+        return {category: self._by_category.count(category) for category in self._by_category.keys()}
+
+    def count_items_in_category(self, category):
+        return self._by_category.count(category)
     
     def get_popular_items(self, limit=10):
         """الحصول على العناصر الأكثر شعبية"""
-        sorted_items = sorted(
-            self.items.items(),
-            key=lambda x: x[1]["popularity"],
-            reverse=True
-        )
-        return [item for item, _ in sorted_items[:limit]]
+        return self._popular.top(limit)
+
+    def get_popular_in_category(self, category, limit=10):
+        """العناصر الأكثر شعبية داخل تصنيف معين"""
+        return self._popular.top(limit, category)
     
     def search_items(self, query):
-        """بحث في العناصر"""
-        query = query.lower()
-        results = []
-        
-        for item, info in self.items.items():
-            score = 0
-            
-            # البحث في العنوان
-            if query in item.lower():
-                score += 3
-            
-            # البحث في التصنيف
-            if query in info["category"].lower():
-                score += 2
-            
-            # البحث في الوسوم
-            for tag in info["tags"]:
-                if query in tag.lower():
-                    score += 1
-            
-            if score > 0:
-                results.append((item, score, info))
-        
-        # ترتيب النتائج حسب النقاط
-        results.sort(key=lambda x: x[1], reverse=True)
-        return results
-    
+        """بحث في العناصر (العنوان 3 نقاط، التصنيف 2، كل وسم 1)"""
+        return self._search.search(query)
+
+    def search_prefix(self, text, limit=10):
+        """بحث أثناء الكتابة بالبادئة"""
+        return self._search.search_prefix(text, limit)
+
     def update_popularity(self, item_name, action):
-        """تحديث درجة الشعبية"""
+        """تحديث درجة الشعبية (تتلاشى مع الزمن بنصف عمر half_life)"""
         if item_name in self.items:
+            info = self.items[item_name]
             if action == "view":
-                self.items[item_name]["views"] += 1
-                self.items[item_name]["popularity"] += 0.01
+                info["views"] += 1
+                raw = self._decay.add(item_name, 0.01)
             elif action == "like":
-                self.items[item_name]["likes"] += 1
-                self.items[item_name]["popularity"] += 0.05
+                info["likes"] += 1
+                raw = self._decay.add(item_name, 0.05)
             elif action == "share":
-                self.items[item_name]["popularity"] += 0.1
-            
-            # تقييد درجة الشعبية بين 0 و 1
-            self.items[item_name]["popularity"] = max(0, min(1, self.items[item_name]["popularity"]))
+                raw = self._decay.add(item_name, 0.1)
+            else:
+                return
+
+            self._popular.update(item_name, info["category"], raw, self._order[item_name])
+            # نسخة وقت آخر تحديث فقط، القيمة الحالية (بعد التلاشي) عبر get_popularity
+            info["popularity"] = self.get_popularity(item_name)
+
+            if self._similarity is not None:
+                self._similarity.set_popularity(item_name, raw)
+            if self._mood_index is not None:
+                self._mood_index.set_popularity(item_name, raw)
+
+    def get_popularity(self, item_name):
+        """الشعبية الحالية بين 0 و 1 (بعد التلاشي، مطبعة بـ _popularity_scale)"""
+        return self._decay.raw(item_name) * self._popularity_scale()
+
+    def _popularity_scale(self):
+        """
+        معامل التحويل من القيمة الخام إلى الشعبية المعروضة: القيمة بعد التلاشي
+        مقسومة على max(1، شعبية العنصر الأعلى). القيم حتى 1 تبقى كما هي،
+        وبعدها النسبة للعنصر الأعلى (لا تتشبع العناصر الأكثر استخداماً عند 1)
+        """
+        factor = self._decay.decay_factor()
+        return factor / max(1.0, self._popular.max_score() * factor)
+
+    def _on_popularity_rescale(self, factor):
+        """إعادة ضبط الحقبة: كل القيم الخام ضُربت في نفس المعامل"""
+        self._popular.rescale(factor)
+        if self._similarity is not None:
+            self._similarity.popularity *= factor
+        if self._mood_index is not None:
+            self._mood_index.rescale(factor)
     
+    def get_mood_index(self):
+        """فهرس المزاج -> عناصر مرتبة (يتحدث مع كل تغيير في العناصر أو الشعبية)"""
+        if self._mood_index is None:
+            self._mood_index = MoodItemIndex()
+            for item_name, info in self.items.items():
+                self._mood_index.update_item(item_name, info, self._decay.raw(item_name), self._order[item_name])
+        return self._mood_index
+
+    def get_items_for_mood(self, mood, limit=10):
+        """عناصر الكتالوج المناسبة لمزاج، مرتبة حسب التوافق × الشعبية"""
+        return self.get_mood_index().items_for(mood, limit)
+
+    def get_similarity_engine(self):
+        """محرك التشابه المتجه، أو None إذا لم تكن numpy/scipy متوفرة"""
+        if self._similarity is None and ItemSimilarityEngine is not None:
+            self._similarity = ItemSimilarityEngine(self.items)
+            for position, name in enumerate(self._similarity.names):
+                self._similarity.popularity[position] = self._decay.raw(name)
+        return self._similarity
+
     def get_recommendations_by_item(self, item_name, num=5):
         """الحصول على توصيات بناء على عنصر معين"""
         if item_name not in self.items:
             return []
+
+        engine = self.get_similarity_engine()
+        if engine is not None:
+            engine.popularity_scale = self._popularity_scale()
+            return engine.similar(item_name, num)
         
         target_item = self.items[item_name]
         similarities = []
@@ -263,7 +452,7 @@ class ContentDatabase:
             similarity += len(common_tags) * 0.5
             
             # إضافة درجة الشعبية
-            similarity += other_info["popularity"] * 0.3
+            similarity += self.get_popularity(other_item) * 0.3
             
             similarities.append((other_item, similarity))
         
@@ -273,10 +462,7 @@ class ContentDatabase:
     
     def get_categories(self):
         """الحصول على جميع التصنيفات"""
-        categories = set()
-        for info in self.items.values():
-            categories.add(info["category"])
-        return list(categories)
+        return self._by_category.keys()
     
     def get_stats(self):
         """إحصائيات قاعدة البيانات"""
@@ -288,6 +474,6 @@ class ContentDatabase:
             "total_items": total_items,
             "total_views": total_views,
             "total_likes": total_likes,
-            "categories_count": len(self.get_categories()),
-            "avg_popularity": sum(item["popularity"] for item in self.items.values()) / total_items
+            "categories_count": len(self._by_category),
+            "avg_popularity": self._decay.total_raw * self._popularity_scale() / total_items
         }
\ No newline at end of file
@@ -0,0 +1,326 @@
+"""
+بديل محلي بسيط لـ Firestore
+يُستخدم لتجربة الكتالوج والسيرفرات بدون اتصال بالإنترنت
+"""
+import asyncio
+import threading
+import time
+from datetime import datetime, timezone
+
+
+class _ChangeType:
+    """نوع التغيير (يحاكي google.cloud.firestore.ChangeType)"""
+
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return f"ChangeType.{self.name}"
+
+
+ADDED = _ChangeType("ADDED")
+MODIFIED = _ChangeType("MODIFIED")
+REMOVED = _ChangeType("REMOVED")
+
+
+class FakeDocumentSnapshot:
+    def __init__(self, doc_id, data, reference=None):
+        self.id = doc_id
+        self._data = data
+        self.reference = reference
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def to_dict(self):
+        if self._data is None:
+            return None
+        return dict(self._data)
+
+    def get(self, field):
+        return (self._data or {}).get(field)
+
+
+class FakeDocumentChange:
+    def __init__(self, change_type, document):
+        self.type = change_type
+        self.document = document
+
+
+class FakeWatch:
+    """كائن المستمع المُرجع من on_snapshot"""
+
+    def __init__(self, unsubscribe):
+        self._unsubscribe = unsubscribe
+        self.is_active = True  # مثل Watch: يصبح False بعد الإيقاف أو انقطاع الاتصال
+
+    def unsubscribe(self):
+        self.is_active = False
+        self._unsubscribe()
+
+
+def _matches(data, field, op, value):
+    """تطبيق شرط where واحد على مستند"""
+    if field not in data:
+        return False
+    current = data[field]
+    try:
+        if op == "==":
+            return current == value
+        if op == "!=":
+            return current != value
+        if op == ">":
+            return current > value
+        if op == ">=":
+            return current >= value
+        if op == "<":
+            return current < value
+        if op == "<=":
+            return current <= value
+        if op == "in":
+            return current in value
+        if op == "array_contains":
+            return isinstance(current, list) and value in current
+    except TypeError:
+        return False
+    raise ValueError(f"Unsupported operator: {op}")
+
+
+class FakeQuery:
+    def __init__(self, collection, filters=()):
+        self._collection = collection
+        self._filters = tuple(filters)
+
+    def where(self, field, op, value):
+        return FakeQuery(self._collection, self._filters + ((field, op, value),))
+
+    def stream(self):
+        self._collection._client._rpc()
+        yield from self._snapshots()
+
+    def _snapshots(self):
+        client = self._collection._client
+        with client._lock:
+            docs = list(self._collection._docs.items())
+        for doc_id, data in docs:
+            if all(_matches(data, f, op, v) for f, op, v in self._filters):
+                client.reads += 1
+                yield FakeDocumentSnapshot(doc_id, dict(data), self._collection.document(doc_id))
+
+    def get(self):
+        return list(self.stream())
+
+
+class FakeCollectionReference(FakeQuery):
+    def __init__(self, client, name):
+        super().__init__(self)
+        self._client = client
+        self.id = name
+        self._docs = {}
+        self._listeners = []
+
+    def document(self, doc_id):
+        return FakeDocumentReference(self, doc_id)
+
+    def on_snapshot(self, callback):
+        """تسجيل مستمع على المجموعة، اللقطة الأولى تحتوي كل المستندات كـ ADDED"""
+        with self._client._lock:
+            self._listeners.append(callback)
+            docs = [FakeDocumentSnapshot(i, dict(d), self.document(i)) for i, d in self._docs.items()]
+        self._client.reads += len(docs)
+        callback(docs, [FakeDocumentChange(ADDED, d) for d in docs], _now())
+
+        def unsubscribe():
+            with self._client._lock:
+                if callback in self._listeners:
+                    self._listeners.remove(callback)
+
+        return FakeWatch(unsubscribe)
+
+    def _notify(self, change_type, doc_id, data):
+        """إبلاغ المستمعين بتغيير مستند"""
+        with self._client._lock:
+            listeners = list(self._listeners)
+            doc_listeners = list(self._client._doc_listeners.get((self.id, doc_id), []))
+        snapshot = FakeDocumentSnapshot(doc_id, dict(data) if data is not None else None,
+                                        self.document(doc_id))
+        read_time = _now()
+        for callback in listeners:
+            self._client.reads += 1
+            callback([snapshot], [FakeDocumentChange(change_type, snapshot)], read_time)
+        for callback in doc_listeners:
+            self._client.reads += 1
+            callback([snapshot], [FakeDocumentChange(change_type, snapshot)], read_time)
+
+
+class FakeDocumentReference:
+    def __init__(self, collection, doc_id):
+        self._collection = collection
+        self.id = doc_id
+        self.path = f"{collection.id}/{doc_id}"
+
+    def get(self):
+        self._collection._client._rpc()
+        return self._snapshot()
+
+    def _snapshot(self):
+        client = self._collection._client
+        client.reads += 1
+        with client._lock:
+            data = self._collection._docs.get(self.id)
+        return FakeDocumentSnapshot(self.id, dict(data) if data is not None else None, self)
+
+    def set(self, data, merge=False):
+        client = self._collection._client
+        with client._lock:
+            existed = self.id in self._collection._docs
+            if merge and existed:
+                new_data = dict(self._collection._docs[self.id])
+                new_data.update(data)
+            else:
+                new_data = dict(data)
+            self._collection._docs[self.id] = new_data
+        client.writes += 1
+        self._collection._notify(MODIFIED if existed else ADDED, self.id, new_data)
+
+    def update(self, data):
+        with self._collection._client._lock:
+            if self.id not in self._collection._docs:
+                raise KeyError(f"No document to update: {self.path}")
+        self.set(data, merge=True)
+
+    def delete(self):
+        client = self._collection._client
+        with client._lock:
+            data = self._collection._docs.pop(self.id, None)
+        client.writes += 1
+        if data is not None:
+            self._collection._notify(REMOVED, self.id, data)
+
+    def on_snapshot(self, callback):
+        """تسجيل مستمع على مستند واحد"""
+        client = self._collection._client
+        key = (self._collection.id, self.id)
+        with client._lock:
+            client._doc_listeners.setdefault(key, []).append(callback)
+        snapshot = self.get()
+        callback([snapshot], [FakeDocumentChange(ADDED, snapshot)] if snapshot.exists else [], _now())
+
+        def unsubscribe():
+            with client._lock:
+                listeners = client._doc_listeners.get(key, [])
+                if callback in listeners:
+                    listeners.remove(callback)
+
+        return FakeWatch(unsubscribe)
+
+
+class FakeFirestore:
+    """عميل Firestore وهمي في الذاكرة مع عدّاد للقراءات وزمن استجابة اختياري"""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency  # بالثواني لكل طلب شبكة
+        self.reads = 0
+        self.writes = 0
+        self.rpcs = 0
+        self._collections = {}
+        self._doc_listeners = {}
+        self._lock = threading.RLock()
+
+    def _rpc(self):
+        self.rpcs += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def collection(self, name):
+        with self._lock:
+            if name not in self._collections:
+                self._collections[name] = FakeCollectionReference(self, name)
+            return self._collections[name]
+
+    def get_all(self, references):
+        """جلب عدة مستندات في طلب واحد"""
+        self._rpc()
+        for ref in references:
+            yield ref._snapshot()
+
+    def reset_counters(self):
+        self.reads = 0
+        self.writes = 0
+        self.rpcs = 0
+
+    def async_client(self):
+        """عميل غير متزامن يشارك نفس البيانات (يحاكي AsyncClient)"""
+        return FakeAsyncFirestore(self)
+
+
+class FakeAsyncQuery:
+    def __init__(self, client, query):
+        self._client = client
+        self._query = query
+
+    def where(self, field, op, value):
+        return FakeAsyncQuery(self._client, self._query.where(field, op, value))
+
+    async def stream(self):
+        await self._client._rpc()
+        for snapshot in self._query._snapshots():
+            yield snapshot
+
+    async def get(self):
+        return [snapshot async for snapshot in self.stream()]
+
+
+class FakeAsyncCollectionReference(FakeAsyncQuery):
+    def document(self, doc_id):
+        return FakeAsyncDocumentReference(self._client, self._query.document(doc_id))
+
+
+class FakeAsyncDocumentReference:
+    def __init__(self, client, reference):
+        self._client = client
+        self._reference = reference
+        self.id = reference.id
+        self.path = reference.path
+
+    async def get(self):
+        await self._client._rpc()
+        return self._reference._snapshot()
+
+    async def set(self, data, merge=False):
+        await self._client._rpc()
+        self._reference.set(data, merge=merge)
+
+    async def update(self, data):
+        await self._client._rpc()
+        self._reference.update(data)
+
+    async def delete(self):
+        await self._client._rpc()
+        self._reference.delete()
+
+
+class FakeAsyncFirestore:
+    """نسخة غير متزامنة من FakeFirestore، الانتظار عبر asyncio.sleep"""
+
+    def __init__(self, sync_client):
+        self._sync = sync_client
+
+    async def _rpc(self):
+        self._sync.rpcs += 1
+        if self._sync.latency:
+            await asyncio.sleep(self._sync.latency)
+
+    def collection(self, name):
+        return FakeAsyncCollectionReference(self, self._sync.collection(name))
+
+    async def get_all(self, references):
+        """جلب عدة مستندات في طلب واحد"""
+        await self._rpc()
+        for ref in references:
+            yield ref._reference._snapshot()
+
+
+def _now():
+    return datetime.now(timezone.utc)
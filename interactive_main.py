@@ -12,13 +12,18 @@ class InteractiveRecommendationApp:
     def __init__(self):
         self.auth = AuthenticationSystem()
         self.recommender = SmartRecommender()
-        self.load_existing_users()
     
     def load_existing_users(self):
-        """تحميل المستخدمين المسجلين مسبقاً"""
-        for username, user_data in self.auth.users.items():
-            user_id = user_data["user_id"]
+        """تحميل كل المستخدمين المسجلين مسبقاً (غير مطلوب عادةً: التحميل يتم عند الدخول)"""
+        for username in self.auth.users:
+            self.ensure_user_loaded(username)
+    
+    def ensure_user_loaded(self, username):
+        """إضافة المستخدم لنظام التوصية عند أول وصول له"""
+        user_id = self.auth.users[username]["user_id"]
+        if user_id not in self.recommender.users:
             self.recommender.add_user(user_id, username)
+        return user_id
     
     def display_menu(self):
         """عرض القائمة الرئيسية"""
@@ -57,8 +62,7 @@ class InteractiveRecommendationApp:
         
         if success:
             # إضافة المستخدم لنظام التوصية
-            user_data = self.auth.users[username]
-            self.recommender.add_user(user_data["user_id"], username)
+            self.ensure_user_loaded(username)
             
             # جمع بيانات الملف الشخصي
             self.collect_profile_info(username)
@@ -127,6 +131,8 @@ class InteractiveRecommendationApp:
         success, message = self.auth.login(username, password)
         print(f"\n{'✅' if success else '❌'} {message}")
         
+        if success:
+            self.ensure_user_loaded(username)
         return success
     
     def browse_content(self):
@@ -138,9 +144,9 @@ class InteractiveRecommendationApp:
         
         while True:
             print("\nالتصنيفات المتاحة:")
+            counts = self.get_category_counts()
             for i, cat in enumerate(categories, 1):
-                items_count = len(self.recommender.database.get_items_by_category(cat))
-                print(f"{i}. {cat} ({items_count} عنصر)")
+                print(f"{i}. {cat} ({counts.get(cat, 0)} عنصر)")
             print(f"{len(categories)+1}. العودة للقائمة الرئيسية")
             
             try:
@@ -155,6 +161,13 @@ class InteractiveRecommendationApp:
             except ValueError:
                 print("❌ الرجاء إدخال رقم")
     
+    def get_category_counts(self):
+        """عدد العناصر في كل تصنيف (من الفهرس إذا كان متوفراً)"""
+        database = self.recommender.database
+        if hasattr(database, 'get_category_counts'):
+            return database.get_category_counts()
+        return {cat: len(database.get_items_by_category(cat)) for cat in database.get_categories()}
+    
     def show_category_items(self, category):
         """عرض عناصر تصنيف معين"""
         items = self.recommender.database.get_items_by_category(category)
@@ -380,9 +393,9 @@ class InteractiveRecommendationApp:
         # عرض بعض المحتوى
         categories = self.recommender.database.get_categories()
         print("\nالتصنيفات المتاحة:")
+        counts = self.get_category_counts()
         for i, cat in enumerate(categories[:5], 1):  # أول 5 تصنيفات فقط
-            items_count = len(self.recommender.database.get_items_by_category(cat))
-            print(f"{i}. {cat} ({items_count} عنصر)")
+            print(f"{i}. {cat} ({counts.get(cat, 0)} عنصر)")
         
         # عرض بعض العناصر الشائعة
         if hasattr(self.recommender.database, 'get_popular_items'):
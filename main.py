@@ -1,7 +1,7 @@
 from fastapi import FastAPI
 import firebase_admin
-from firebase_admin import credentials, firestore
-from recommender_ai import get_recommendations # استدعاء ملف الذكاء
+from firebase_admin import credentials, firestore, firestore_async
+from recommender_ai import get_recommendations_async # استدعاء ملف الذكاء
 import uvicorn
 
 app = FastAPI()
@@ -16,7 +16,15 @@ if not firebase_admin._apps:
     except Exception as e:
         print(f"❌ فشل الاتصال: {e}")
 
-db = firestore.client()
+# عميل غير متزامن حتى لا تحجز قراءات Firestore خيوط السيرفر
+db = firestore_async.client()
+
+# العميل المتزامن يشغل مستمع on_snapshot للكتالوج (غير متوفر في AsyncClient)
+try:
+    listener_db = firestore.client()
+except Exception as e:
+    print(f"Listeners disabled: {e}")
+    listener_db = None
 
 # --- الرابط الرئيسي ---
 @app.get("/")
@@ -25,11 +33,11 @@ def home():
 
 # --- رابط التوصية (المهم لـ Flutter) ---
 @app.get("/recommend/{user_id}")
-def recommend_products(user_id: str):
+async def recommend_products(user_id: str):
     print(f"📩 وصل طلب توصية للمستخدم: {user_id}")
     try:
         # استدعاء دالة التوصية من الملف الآخر
-        products_list = get_recommendations(user_id, db)
+        products_list = await get_recommendations_async(user_id, db, listener_db)
         
         return {
             "status": "success",
@@ -132,6 +132,7 @@ def main():
     print(f"✅ تم تصدير التقرير التحليلي ({report['generated_at']})")
     print(f"   - إجمالي المستخدمين: {report['total_users']}")
     print(f"   - إجمالي التفاعلات: {report['total_interactions']}")
+    analytics.close()
     
     print("\n🎉 اكتمل تشغيل النظام!")
 
@@ -0,0 +1,126 @@
+"""
+توصيات بتحليل مصفوفة التفاعلات الضمنية (TruncatedSVD)
+التدريب يتم مسبقاً ويحفظ:
+    item_factors.npy   (عنصر × عامل) يُفتح بـ mmap عند التحميل
+    seen.npz           العناصر التي تفاعل معها كل مستخدم (لاستبعادها)
+    model.json         أسماء المستخدمين والعناصر
+والتوصية: متجه المستخدم = صفه × عوامل العناصر، ثم ضرب واحد في مصفوفة العناصر
+و argpartition لأفضل K مع استبعاد ما شاهده
+
+سجل التفاعلات يكتبه POST /interactions في server.py (متغير INTERACTION_LOG)،
+فالمستخدمون معرفات Firestore والعناصر معرفات المنتجات في الكتالوج، وهي نفس
+المعرفات التي يبحث بها السيرفر عند التوصية. سجل AnalyticsDashboard في
+main_enhanced.py مبني على عناوين ContentDatabase ولا يصلح لنموذج السيرفر
+
+الاستخدام:
+    python matrix_factorization.py train interactions.ndjson mf_model/
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+from scipy import sparse
+from sklearn.decomposition import TruncatedSVD
+
+from user_behavior import event_score
+
+
+def load_interactions(filename):
+    """
+    قراءة سجل التفاعلات (سطر JSON لكل تفاعل كما يكتبه AnalyticsDashboard)
+    يرجع (مصفوفة CSR مستخدم × عنصر، user_ids، أسماء العناصر)
+    """
+    users, items = {}, {}
+    rows, cols, values = [], [], []
+    with open(filename, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            score = event_score(record["action"], record.get("duration"))
+            if not score:
+                continue
+            rows.append(users.setdefault(record["user_id"], len(users)))
+            cols.append(items.setdefault(record["item"], len(items)))
+            values.append(score)
+    matrix = sparse.csr_matrix((values, (rows, cols)), shape=(len(users), len(items)), dtype=np.float64)
+    return matrix, list(users), list(items)
+
+
+def train_factors(matrix, factors=64, random_state=0):
+    """عوامل العناصر من TruncatedSVD على log(1 + الوزن) (يخفف أثر التفاعلات المتكررة)"""
+    if min(matrix.shape) < 2:
+        raise ValueError(
+            f"need at least 2 users and 2 items to factorize, got {matrix.shape[0]} x {matrix.shape[1]}"
+        )
+    confidence = matrix.copy().astype(np.float32)
+    np.log1p(confidence.data, out=confidence.data)
+    factors = min(factors, min(confidence.shape) - 1)
+    svd = TruncatedSVD(n_components=factors, algorithm="randomized", n_iter=5, random_state=random_state)
+    svd.fit(confidence)
+    return np.ascontiguousarray(svd.components_.T, dtype=np.float32), confidence
+
+
+def train_model(matrix, user_ids, item_names, model_dir, factors=64):
+    item_factors, confidence = train_factors(matrix, factors)
+    os.makedirs(model_dir, exist_ok=True)
+    np.save(os.path.join(model_dir, "item_factors.npy"), item_factors)
+    sparse.save_npz(os.path.join(model_dir, "seen.npz"), confidence.tocsr())
+    with open(os.path.join(model_dir, "model.json"), 'w', encoding='utf-8') as f:
+        json.dump({"users": user_ids, "items": item_names}, f, ensure_ascii=False)
+    return MFRecommender(model_dir)
+
+
+def train_from_users(users, model_dir, factors=64):
+    """التدريب من {user_id: UserBehavior} مباشرة (نفس مصفوفة collaborative.py)"""
+    from collaborative import interaction_matrix
+    from user_behavior import ITEMS
+    matrix, user_ids = interaction_matrix(users)
+    return train_model(matrix, user_ids, ITEMS.values[:matrix.shape[1]], model_dir, factors)
+
+
+class MFRecommender:
+    def __init__(self, model_dir):
+        with open(os.path.join(model_dir, "model.json"), 'r', encoding='utf-8') as f:
+            names = json.load(f)
+        self.items = names["items"]
+        self.rows = {user_id: row for row, user_id in enumerate(names["users"])}
+        self.item_factors = np.load(os.path.join(model_dir, "item_factors.npy"), mmap_mode="r")
+        self.seen = sparse.load_npz(os.path.join(model_dir, "seen.npz")).tocsr()
+
+    def __contains__(self, user_id):
+        return user_id in self.rows
+
+    def recommend(self, user_id, num=10):
+        """أفضل num عناصر لم يتفاعل معها المستخدم"""
+        row = self.rows.get(user_id)
+        if row is None:
+            return []
+        start, end = self.seen.indptr[row], self.seen.indptr[row + 1]
+        seen_items = self.seen.indices[start:end]
+        user_vector = self.seen.data[start:end] @ self.item_factors[seen_items]
+        scores = self.item_factors @ user_vector
+        scores[seen_items] = -np.inf
+
+        num = min(num, len(scores) - len(seen_items))
+        if num <= 0:
+            return []
+        top = np.argpartition(-scores, num - 1)[:num]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [self.items[i] for i in top]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the matrix factorization recommender")
+    parser.add_argument("command", choices=["train"])
+    parser.add_argument("interactions_file")
+    parser.add_argument("model_dir")
+    parser.add_argument("--factors", type=int, default=64)
+    args = parser.parse_args()
+    matrix, user_ids, item_names = load_interactions(args.interactions_file)
+    try:
+        train_model(matrix, user_ids, item_names, args.model_dir, args.factors)
+    except ValueError as e:
+        raise SystemExit(f"error: {e}")
+    print(f"trained on {matrix.nnz} user-item pairs: {len(user_ids)} users x {len(item_names)} items")
@@ -1,31 +1,133 @@
 """
 مكتشف المزاج البسيط
+الكلمات المفتاحية لكل مزاج تُجمع في تعبير نمطي واحد (شجرة بادئات) يُبنى مرة واحدة،
+والنص يُمسح مرة واحدة بعد التطبيع العربي (نفس تطبيع البحث)
 """
+import json
+import re
+
+from search_index import normalize_text
+
+NEUTRAL_MOOD = "محايد"
+_BATCH_SEPARATOR = "\x00"
+
+# الترتيب هو الأولوية: عند وجود كلمات من أكثر من مزاج يُختار الأول
+DEFAULT_LEXICON = {
+    "سعيد": ["مبسوط", "سعيد", "فرح", "مسرور"],
+    "حزين": ["زعلان", "حزين", "تعيس", "محبط"],
+    "مرهق": ["تعبان", "مرهق", "متعب", "إرهاق"],
+    "غاضب": ["غاضب", "عصبي", "منزعج"],
+}
+
+# أنواع محتوى عامة لكل مزاج (عند عدم توفر قاعدة محتوى)
+MOOD_RECOMMENDATIONS = {
+    "سعيد": ["موسيقى حماسية", "فيديوهات كوميدية", "ألعاب ممتعة"],
+    "حزين": ["موسيقى هادئة", "فيديوهات ملهمة", "نصائح للراحة النفسية"],
+    "مرهق": ["موسيقى استرخاء", "تمارين تنفس", "نصائح للنوم"],
+    "غاضب": ["موسيقى مهدئة", "تمارين رياضية", "نصائح للهدوء"],
+    "محايد": ["فيديوهات تعليمية", "مقالات متنوعة", "محتويات جديدة"]
+}
+
+
+def load_lexicon(filename):
+    """قاموس من ملف JSON بالشكل {"المزاج": ["كلمة", ...]}، ترتيب المفاتيح هو الأولوية"""
+    with open(filename, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _trie_pattern(node):
+    """تعبير نمطي من شجرة بادئات: في كل موضع فرع واحد فقط يُتابع (بدل تجربة كل الكلمات)"""
+    branches = [re.escape(char) + _trie_pattern(node[char]) for char in sorted(k for k in node if k)]
+    if not branches:
+        return ""
+    body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+    if "" in node:
+        body = f"(?:{body})?"  # نهاية كلمة: الأطول أولاً ثم الأقصر
+    return body
+
+
+def compile_lexicon(lexicon):
+    """
+    يرجع (المزاجات، التعبير، أولوية كل كلمة)
+    كل الكلمات في تعبير واحد مبني من شجرة بادئات داخل نظرة للأمام،
+    فيُرجع أطول كلمة تبدأ عند كل موضع في النص. الكلمات الأقصر التي تبدأ
+    في نفس الموضع هي بادئات لها، لذلك أولوية الكلمة = أعلى أولوية بين بادئاتها
+    """
+    moods = list(lexicon)
+    priority = {}
+    for index, mood in enumerate(moods):
+        for word in lexicon[mood]:
+            word = normalize_text(word)
+            if word and word not in priority:
+                priority[word] = index
+    if not priority:
+        return moods, None, {}
+
+    trie = {}
+    for word in priority:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = True
+
+    best = {}
+    for word in priority:
+        best[word] = min(priority[word[:i]] for i in range(1, len(word) + 1) if word[:i] in priority)
+    return moods, re.compile(f"(?=({_trie_pattern(trie)}))"), best
+
 
 class MoodDetector:
+    def __init__(self, lexicon=None, lexicon_file=None, model_dir=None):
+        if lexicon_file:
+            lexicon = load_lexicon(lexicon_file)
+        self.lexicon = lexicon or DEFAULT_LEXICON
+        self._moods, self._pattern, self._priority = compile_lexicon(self.lexicon)
+        # نموذج اختياري (mood_model.py) للنصوص التي لا تطابق أي كلمة مفتاحية
+        self.model = None
+        if model_dir:
+            from mood_model import MoodModel
+            self.model = MoodModel(model_dir)
+
     def detect(self, text):
         """تحليل بسيط لمزاج المستخدم"""
-        text = str(text).lower()  # تحويل للنص الصغير
-        
-        # تحقق من الكلمات العربية
-        if any(word in text for word in ["مبسوط", "سعيد", "فرح", "مسرور"]):
-            return "سعيد"
-        elif any(word in text for word in ["زعلان", "حزين", "تعيس", "محبط"]):
-            return "حزين"
-        elif any(word in text for word in ["تعبان", "مرهق", "متعب", "إرهاق"]):
-            return "مرهق"
-        elif any(word in text for word in ["غاضب", "عصبي", "منزعج"]):
-            return "غاضب"
-        else:
-            return "محايد"
-    
-    def get_mood_based_recommendations(self, mood):
-        """توصيات بناءً على المزاج"""
-        mood_recommendations = {
-            "سعيد": ["موسيقى حماسية", "فيديوهات كوميدية", "ألعاب ممتعة"],
-            "حزين": ["موسيقى هادئة", "فيديوهات ملهمة", "نصائح للراحة النفسية"],
-            "مرهق": ["موسيقى استرخاء", "تمارين تنفس", "نصائح للنوم"],
-            "غاضب": ["موسيقى مهدئة", "تمارين رياضية", "نصائح للهدوء"],
-            "محايد": ["فيديوهات تعليمية", "مقالات متنوعة", "محتويات جديدة"]
-        }
-        return mood_recommendations.get(mood, ["محتويات متنوعة"])
\ No newline at end of file
+        if self.model is not None:
+            return self.detect_batch([text])[0]
+        return self._classify(normalize_text(text))
+
+    def _classify(self, text):
+        if self._pattern is None:
+            return NEUTRAL_MOOD
+        best = None
+        for match in self._pattern.finditer(text):
+            index = self._priority[match.group(1)]
+            if best is None or index < best:
+                best = index
+                if best == 0:
+                    break
+        return NEUTRAL_MOOD if best is None else self._moods[best]
+
+    def detect_batch(self, texts):
+        """مزاج كل نص في قائمة (التطبيع يتم على الدفعة كاملة مرة واحدة)"""
+        texts = [str(text) for text in texts]
+        normalized = normalize_text(_BATCH_SEPARATOR.join(texts)).split(_BATCH_SEPARATOR)
+        if len(normalized) != len(texts):  # الفاصل موجود داخل أحد النصوص
+            normalized = [normalize_text(text) for text in texts]
+        classify = self._classify
+        moods = [classify(text) for text in normalized]
+
+        if self.model is not None:
+            # الكلمات المفتاحية مسار سريع واثق، والباقي يُصنف بالنموذج دفعة واحدة
+            pending = [i for i, mood in enumerate(moods) if mood == NEUTRAL_MOOD]
+            predicted, _ = self.model.predict([texts[i] for i in pending])
+            for i, mood in zip(pending, predicted):
+                moods[i] = mood
+        return moods
+
+    def get_mood_based_recommendations(self, mood, database=None, limit=5):
+        """
+        توصيات بناءً على المزاج: عناصر حقيقية من قاعدة المحتوى عند تمريرها
+        (عبر فهرس المزاج المحسوب مسبقاً)، وإلا أنواع محتوى عامة
+        """
+        if database is not None:
+            return database.get_items_for_mood(mood, limit)
+        return MOOD_RECOMMENDATIONS.get(mood, ["محتويات متنوعة"])
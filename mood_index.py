@@ -0,0 +1,97 @@
+"""
+فهرس مزاج -> عناصر مرتبة من قاعدة المحتوى
+درجة العنصر لمزاج = التوافق (من جدول الوسوم والتصنيفات) × الشعبية الخام،
+والشعبية الخام تتغير بمعامل مشترك فقط عند إعادة ضبط الحقبة،
+لذلك يكفي تحديث العنصر الذي تغيرت شعبيته
+"""
+from popularity import PopularityIndex
+
+# توافق كل مزاج مع التصنيفات والوسوم (القيمة بين 0 و 1)
+MOOD_AFFINITY = {
+    "سعيد": {
+        "categories": {"Entertainment": 1.0, "Gaming": 0.8, "Music": 0.6},
+        "tags": {"comics": 1.0, "games": 0.8, "pop": 0.8, "movies": 0.6, "marvel": 0.6,
+                 "superhero": 0.6, "esports": 0.5, "dessert": 0.4},
+    },
+    "حزين": {
+        "categories": {"Music": 0.6},
+        "tags": {"relax": 1.0, "jazz": 0.8, "meditation": 0.8, "wellness": 0.6, "nostalgia": 0.6,
+                 "classic": 0.5, "sweet": 0.4, "dessert": 0.4},
+    },
+    "مرهق": {
+        "categories": {},
+        "tags": {"relax": 1.0, "meditation": 1.0, "yoga": 0.8, "wellness": 0.8, "jazz": 0.6,
+                 "healthy": 0.5, "breakfast": 0.3},
+    },
+    "غاضب": {
+        "categories": {"Fitness": 1.0},
+        "tags": {"workout": 1.0, "exercise": 0.8, "meditation": 0.8, "relax": 0.6, "yoga": 0.6},
+    },
+    "محايد": {
+        "categories": {"Programming": 0.6, "AI & ML": 0.6, "Web Development": 0.6, "Business": 0.5,
+                       "Finance": 0.5},
+        "tags": {"tutorial": 1.0, "study": 0.8, "tips": 0.6, "beginner": 0.6, "review": 0.4},
+    },
+}
+
+
+def mood_affinity(info, affinity):
+    """توافق عنصر مع مزاج: أعلى وزن وسم + وزن التصنيف"""
+    tag_weights = affinity["tags"]
+    best_tag = max((tag_weights.get(tag, 0.0) for tag in info["tags"]), default=0.0)
+    return best_tag + affinity["categories"].get(info["category"], 0.0)
+
+
+class MoodItemIndex:
+    """
+    لكل مزاج PopularityIndex مرتب على التوافق × الشعبية الخام
+    ونتائج items_for تُحفظ حتى يتغير ترتيب ذلك المزاج
+    """
+
+    def __init__(self, affinity=None):
+        self.affinity = affinity or MOOD_AFFINITY
+        self._by_mood = {mood: PopularityIndex() for mood in self.affinity}
+        self._weights = {}  # العنصر -> {المزاج: التوافق}
+        self._order = {}
+        self._cache = {}  # المزاج -> {العدد: قائمة العناصر}
+
+    def update_item(self, item_name, info, popularity, order):
+        """إضافة عنصر أو إعادة حساب توافقه بعد التعديل"""
+        weights = {}
+        for mood, affinity in self.affinity.items():
+            weight = mood_affinity(info, affinity)
+            if weight > 0:
+                weights[mood] = weight
+        for mood in set(self._weights.get(item_name, {})) - set(weights):
+            self._by_mood[mood].remove(item_name)
+            self._cache.pop(mood, None)
+        self._weights[item_name] = weights
+        self._order[item_name] = order
+        self.set_popularity(item_name, popularity)
+
+    def set_popularity(self, item_name, popularity):
+        """تحديث ترتيب العنصر بعد تغير شعبيته الخام"""
+        order = self._order.get(item_name)
+        for mood, weight in self._weights.get(item_name, {}).items():
+            self._by_mood[mood].update(item_name, mood, weight * popularity, order)
+            self._cache.pop(mood, None)
+
+    def remove_item(self, item_name):
+        for mood in self._weights.pop(item_name, {}):
+            self._by_mood[mood].remove(item_name)
+            self._cache.pop(mood, None)
+        self._order.pop(item_name, None)
+
+    def rescale(self, factor):
+        """كل القيم الخام ضُربت في نفس المعامل (الترتيب لا يتغير)"""
+        for index in self._by_mood.values():
+            index.rescale(factor)
+
+    def items_for(self, mood, limit=10):
+        """أفضل العناصر لمزاج، مرتبة حسب التوافق × الشعبية"""
+        cached = self._cache.setdefault(mood, {})
+        items = cached.get(limit)
+        if items is None:
+            index = self._by_mood.get(mood)
+            items = cached[limit] = index.top(limit) if index is not None else []
+        return list(items)
@@ -0,0 +1,107 @@
+"""
+نموذج مزاج اختياري: HashingVectorizer على مقاطع الأحرف + نموذج خطي
+التدريب يتم مسبقاً من ملف مصنف (سطر JSON لكل مثال: {"text": ..., "label": ...})
+والمعاملات تُحفظ كملفات .npy وتُفتح عند التحميل بـ mmap (بدون نسخها للذاكرة)
+
+الاستخدام:
+    python mood_model.py train labeled.jsonl mood_model/
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import SGDClassifier
+
+from search_index import normalize_text
+
+DEFAULT_CONFIG = {
+    "analyzer": "char_wb",
+    "ngram_range": [2, 4],
+    "n_features": 2 ** 18,
+}
+
+
+def build_vectorizer(config):
+    return HashingVectorizer(
+        analyzer=config["analyzer"],
+        ngram_range=tuple(config["ngram_range"]),
+        n_features=config["n_features"],
+        preprocessor=normalize_text,
+        lowercase=False,
+        alternate_sign=False,
+        norm="l2",
+    )
+
+
+def load_examples(filename):
+    texts, labels = [], []
+    with open(filename, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                example = json.loads(line)
+                texts.append(example["text"])
+                labels.append(example["label"])
+    return texts, labels
+
+
+def train_mood_model(texts, labels, model_dir, config=None, epochs=20):
+    """تدريب نموذج لوجستي خطي وحفظه في model_dir"""
+    config = dict(DEFAULT_CONFIG, **(config or {}))
+    vectorizer = build_vectorizer(config)
+    classifier = SGDClassifier(loss="log_loss", alpha=1e-6, max_iter=epochs, tol=None, random_state=0)
+    classifier.fit(vectorizer.transform(texts), labels)
+
+    os.makedirs(model_dir, exist_ok=True)
+    coef = classifier.coef_.astype(np.float32)
+    intercept = classifier.intercept_.astype(np.float32)
+    classes = [str(label) for label in classifier.classes_]
+    if len(classes) == 2:
+        # التصنيف الثنائي يعطي صفاً واحداً، نحوله لصفين حتى تبقى المعادلة واحدة
+        coef = np.vstack([-coef, coef])
+        intercept = np.concatenate([-intercept, intercept])
+    np.save(os.path.join(model_dir, "coef.npy"), np.ascontiguousarray(coef.T))
+    np.save(os.path.join(model_dir, "intercept.npy"), intercept)
+    with open(os.path.join(model_dir, "model.json"), 'w', encoding='utf-8') as f:
+        json.dump({"classes": classes, **config}, f, ensure_ascii=False, indent=2)
+    return MoodModel(model_dir)
+
+
+class MoodModel:
+    """الاستدلال على دفعات: مصفوفة متفرقة (نص × ميزة) @ المعاملات (ميزة × مزاج)"""
+
+    def __init__(self, model_dir):
+        with open(os.path.join(model_dir, "model.json"), 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        self.classes = config["classes"]
+        self.vectorizer = build_vectorizer(config)
+        self.coef = np.load(os.path.join(model_dir, "coef.npy"), mmap_mode="r")
+        self.intercept = np.load(os.path.join(model_dir, "intercept.npy"))
+
+    def predict_proba(self, texts):
+        features = self.vectorizer.transform(texts)
+        scores = np.asarray(features @ self.coef) + self.intercept
+        scores -= scores.max(axis=1, keepdims=True)
+        np.exp(scores, out=scores)
+        scores /= scores.sum(axis=1, keepdims=True)
+        return scores
+
+    def predict(self, texts):
+        """يرجع (المزاجات، الثقة) لكل نص"""
+        if not texts:
+            return [], []
+        probabilities = self.predict_proba(texts)
+        best = probabilities.argmax(axis=1)
+        return [self.classes[i] for i in best], probabilities[np.arange(len(best)), best].tolist()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the mood model")
+    parser.add_argument("command", choices=["train"])
+    parser.add_argument("labeled_file")
+    parser.add_argument("model_dir")
+    args = parser.parse_args()
+    texts, labels = load_examples(args.labeled_file)
+    model = train_mood_model(texts, labels, args.model_dir)
+    print(f"trained on {len(texts)} examples, classes: {', '.join(model.classes)}")
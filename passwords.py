@@ -0,0 +1,97 @@
+"""
+تشفير كلمات المرور بـ scrypt (أو PBKDF2) مع ملح عشوائي لكل مستخدم
+صيغة التخزين:
+    scrypt$n$r$p$salt$hash
+    pbkdf2_sha256$iterations$salt$hash
+والتجزئات القديمة (SHA-256 بدون ملح، 64 خانة hex) ما زالت تُقبل
+ويُعاد تشفيرها عند أول دخول ناجح
+"""
+import asyncio
+import hashlib
+import hmac
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+SCRYPT_N = 2 ** 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+PBKDF2_ITERATIONS = 600_000
+SALT_BYTES = 16
+KEY_BYTES = 32
+
+
+def _scrypt(password, salt, n, r, p):
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p,
+                          maxmem=256 * n * r * p, dklen=KEY_BYTES)
+
+
+def _pbkdf2(password, salt, iterations):
+    return hashlib.pbkdf2_hmac("sha256", password.encode(), salt, iterations, dklen=KEY_BYTES)
+
+
+def hash_password(password, scheme="scrypt", n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P,
+                  iterations=PBKDF2_ITERATIONS):
+    salt = os.urandom(SALT_BYTES)
+    if scheme == "scrypt":
+        return f"scrypt${n}${r}${p}${salt.hex()}${_scrypt(password, salt, n, r, p).hex()}"
+    if scheme == "pbkdf2_sha256":
+        return f"pbkdf2_sha256${iterations}${salt.hex()}${_pbkdf2(password, salt, iterations).hex()}"
+    raise ValueError(f"Unknown password scheme: {scheme}")
+
+
+def verify_password(password, stored):
+    """مقارنة كلمة المرور بالتجزئة المخزنة (بزمن ثابت)"""
+    parts = stored.split("$")
+    if parts[0] == "scrypt" and len(parts) == 6:
+        n, r, p = int(parts[1]), int(parts[2]), int(parts[3])
+        expected = _scrypt(password, bytes.fromhex(parts[4]), n, r, p)
+        return hmac.compare_digest(expected.hex(), parts[5])
+    if parts[0] == "pbkdf2_sha256" and len(parts) == 4:
+        expected = _pbkdf2(password, bytes.fromhex(parts[2]), int(parts[1]))
+        return hmac.compare_digest(expected.hex(), parts[3])
+    if len(parts) == 1:
+        # صيغة قديمة: sha256 بدون ملح
+        return hmac.compare_digest(hashlib.sha256(password.encode()).hexdigest(), stored)
+    return False
+
+
+class PasswordHasher:
+    """
+    التشفير والتحقق داخل مجمع عمال محدود الحجم (workers)،
+    حتى لا يحجز حساب KDF المكلف خيط الطلب أو حلقة asyncio
+    hashlib يحرر الـ GIL أثناء scrypt/PBKDF2، لذلك الخيوط تعمل بالتوازي فعلاً
+    """
+
+    def __init__(self, scheme="scrypt", workers=None, use_processes=False,
+                 n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P, iterations=PBKDF2_ITERATIONS):
+        self.scheme = scheme
+        self.params = {"n": n, "r": r, "p": p, "iterations": iterations}
+        self.workers = workers or os.cpu_count() or 1
+        pool_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+        self.pool = pool_class(max_workers=self.workers)
+
+    def hash(self, password):
+        return self.pool.submit(hash_password, password, self.scheme, **self.params).result()
+
+    def verify(self, password, stored):
+        return self.pool.submit(verify_password, password, stored).result()
+
+    async def hash_async(self, password):
+        return await asyncio.wrap_future(
+            self.pool.submit(hash_password, password, self.scheme, **self.params)
+        )
+
+    async def verify_async(self, password, stored):
+        return await asyncio.wrap_future(self.pool.submit(verify_password, password, stored))
+
+    def needs_rehash(self, stored):
+        """التجزئة بصيغة أو إعدادات غير الحالية"""
+        parts = stored.split("$")
+        if parts[0] != self.scheme:
+            return True
+        if self.scheme == "scrypt":
+            return [int(x) for x in parts[1:4]] != [self.params["n"], self.params["r"], self.params["p"]]
+        return int(parts[1]) != self.params["iterations"]
+
+    def close(self):
+        self.pool.shutdown()
@@ -0,0 +1,217 @@
+"""
+هياكل الشعبية لقاعدة المحتوى
+- SortedKeyList: قائمة مرتبة مقسمة لأجزاء، الإضافة والحذف O(log n + حجم الجزء)
+- PopularityIndex: ترتيب العناصر حسب الشعبية (الكل ولكل تصنيف)
+- DecayingScores: شعبية تتلاشى أسياً مع الزمن بدون المرور على كل العناصر
+"""
+import itertools
+import math
+import time
+from bisect import bisect_left, insort
+
+# نصف عمر الشعبية الافتراضي (أسبوع)
+DEFAULT_HALF_LIFE = 7 * 24 * 3600
+
+
+class SortedKeyList:
+    """
+    قائمة مرتبة على شكل أجزاء صغيرة، حتى لا تكلف الإضافة في
+    كتالوج كبير إزاحة القائمة كاملة في الذاكرة
+    """
+
+    def __init__(self, keys=(), load=512):
+        self._load = load
+        self._chunks = []
+        self._maxes = []
+        self._len = 0
+        self._build(sorted(keys))
+
+    def _build(self, ordered):
+        self._chunks = [ordered[i:i + self._load] for i in range(0, len(ordered), self._load)]
+        self._maxes = [chunk[-1] for chunk in self._chunks]
+        self._len = len(ordered)
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        for chunk in self._chunks:
+            yield from chunk
+
+    def add(self, key):
+        if not self._chunks:
+            self._chunks.append([key])
+            self._maxes.append(key)
+            self._len = 1
+            return
+
+        i = bisect_left(self._maxes, key)
+        if i == len(self._maxes):
+            i -= 1
+            self._chunks[i].append(key)
+            self._maxes[i] = key
+        else:
+            insort(self._chunks[i], key)
+        self._len += 1
+
+        chunk = self._chunks[i]
+        if len(chunk) > 2 * self._load:
+            half = chunk[self._load:]
+            del chunk[self._load:]
+            self._chunks.insert(i + 1, half)
+            self._maxes[i] = chunk[-1]
+            self._maxes.insert(i + 1, half[-1])
+
+    def remove(self, key):
+        i = bisect_left(self._maxes, key)
+        if i == len(self._maxes):
+            raise KeyError(key)
+        chunk = self._chunks[i]
+        j = bisect_left(chunk, key)
+        if j == len(chunk) or chunk[j] != key:
+            raise KeyError(key)
+        del chunk[j]
+        self._len -= 1
+        if chunk:
+            self._maxes[i] = chunk[-1]
+        else:
+            del self._chunks[i]
+            del self._maxes[i]
+
+    def head(self, n):
+        """أول n مفاتيح"""
+        return list(itertools.islice(self, n))
+
+    def first(self):
+        return self._chunks[0][0] if self._chunks else None
+
+    def rebuild(self, transform):
+        """تطبيق دالة على كل المفاتيح ثم إعادة الترتيب (للحالات النادرة فقط)"""
+        self._build(sorted(transform(key) for key in self))
+
+
+class PopularityIndex:
+    """ترتيب العناصر حسب الشعبية (الأعلى أولاً) مع كسر التعادل بترتيب الإدخال"""
+
+    def __init__(self):
+        self._all = SortedKeyList()
+        self._by_category = {}
+        self._keys = {}  # العنصر -> (المفتاح، التصنيف)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def update(self, item, category, popularity, order):
+        self.remove(item)
+        key = (-popularity, order, item)
+        self._all.add(key)
+        self._by_category.setdefault(category, SortedKeyList()).add(key)
+        self._keys[item] = (key, category)
+
+    def remove(self, item):
+        entry = self._keys.pop(item, None)
+        if entry is None:
+            return
+        key, category = entry
+        self._all.remove(key)
+        entries = self._by_category[category]
+        entries.remove(key)
+        if not entries:
+            del self._by_category[category]
+
+    def top(self, limit, category=None):
+        entries = self._all if category is None else self._by_category.get(category)
+        if entries is None:
+            return []
+        return [key[2] for key in entries.head(limit)]
+
+    def max_score(self):
+        first = self._all.first()
+        return -first[0] if first is not None else 0.0
+
+    def rescale(self, factor):
+        """ضرب كل الدرجات في معامل موجب (الترتيب لا يتغير)"""
+        def scaled(key):
+            return (key[0] * factor, key[1], key[2])
+
+        self._all.rebuild(scaled)
+        for entries in self._by_category.values():
+            entries.rebuild(scaled)
+        self._keys = {item: (scaled(key), category) for item, (key, category) in self._keys.items()}
+
+
+class DecayingScores:
+    """
+    درجات تتلاشى أسياً بنصف عمر ثابت، بحيلة "الحقبة العامة" الكسولة:
+
+    بدلاً من إنقاص كل الدرجات مع مرور الوقت، نضخم كل زيادة جديدة بـ
+    exp(rate × (now − epoch)) ونخزن القيمة الخام. الدرجة الحقيقية هي
+    raw × exp(−rate × (now − epoch))، والمعامل مشترك بين كل العناصر،
+    لذلك ترتيب القيم الخام هو نفس ترتيب الدرجات الحقيقية.
+    عندما يكبر الأس نعيد ضبط الحقبة (نادراً جداً) عبر on_rescale.
+    """
+
+    def __init__(self, half_life=DEFAULT_HALF_LIFE, clock=time.time, max_exponent=50.0):
+        self.rate = math.log(2) / half_life
+        self.clock = clock
+        self.max_exponent = max_exponent
+        self.on_rescale = None  # دالة تُستدعى بمعامل الضرب عند إعادة ضبط الحقبة
+        self.total_raw = 0.0
+        self._epoch = clock()
+        self._raw = {}
+
+    def __len__(self):
+        return len(self._raw)
+
+    def _growth(self):
+        now = self.clock()
+        exponent = self.rate * (now - self._epoch)
+        if exponent > self.max_exponent:
+            self._rebase(now, exponent)
+            exponent = 0.0
+        return math.exp(exponent)
+
+    def _rebase(self, now, exponent):
+        factor = math.exp(-exponent)
+        self._raw = {key: value * factor for key, value in self._raw.items()}
+        self.total_raw *= factor
+        self._epoch = now
+        if self.on_rescale is not None:
+            self.on_rescale(factor)
+
+    def add(self, key, amount):
+        """زيادة الدرجة الحالية، ترجع القيمة الخام الجديدة"""
+        growth = self._growth()
+        raw = self._raw.get(key, 0.0) + amount * growth
+        self.total_raw += raw - self._raw.get(key, 0.0)
+        self._raw[key] = raw
+        return raw
+
+    def set(self, key, value):
+        """تعيين الدرجة الحالية مباشرة"""
+        raw = value * self._growth()
+        self.total_raw += raw - self._raw.get(key, 0.0)
+        self._raw[key] = raw
+        return raw
+
+    def set_many(self, values):
+        """تعيين عدة درجات بنفس اللحظة (معامل نمو واحد للكل، مثل التحميل الأولي)"""
+        growth = self._growth()
+        for key, value in values:
+            raw = value * growth
+            self.total_raw += raw - self._raw.get(key, 0.0)
+            self._raw[key] = raw
+
+    def remove(self, key):
+        self.total_raw -= self._raw.pop(key, 0.0)
+
+    def raw(self, key):
+        return self._raw.get(key, 0.0)
+
+    def decay_factor(self):
+        """معامل التحويل من القيمة الخام إلى الدرجة الحقيقية الآن"""
+        return math.exp(-self.rate * (self.clock() - self._epoch))
+
+    def value(self, key):
+        """الدرجة الحقيقية بعد التلاشي حتى الآن"""
+        return self._raw.get(key, 0.0) * self.decay_factor()
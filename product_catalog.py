@@ -0,0 +1,418 @@
+"""
+نسخة مشتركة من كتالوج المنتجات في الذاكرة
+تُحمَّل مرة واحدة من Firestore ثم تُحدَّث تدريجياً
+"""
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+
+# حدود شرائح السعر المستخدمة في فهرس التقييم
+PRICE_BANDS = (0.0, 25.0, 50.0, 100.0, 250.0, 500.0, 1000.0)
+
+
+def price_band(price):
+    """رقم شريحة السعر التي ينتمي لها السعر"""
+    return max(bisect_right(PRICE_BANDS, price) - 1, 0)
+
+
+class RatingIndex:
+    """
+    فهرس مرتب حسب التقييم (الأعلى أولاً) يُحدَّث مع كل تغيير في المنتج
+
+    كل منتج محفوظ في قوائم مرتبة: الكل، التصنيف، شريحة السعر،
+    والتصنيف مع شريحة السعر. الإضافة والحذف عبر bisect، وأفضل N
+    منتجات هي أول N عناصر في القائمة المناسبة بدون أي ترتيب لكل طلب.
+    """
+
+    def __init__(self):
+        self.products = {}
+        self._keys = {}  # doc_id -> (مفتاح الترتيب، مفاتيح القوائم)
+        self._lists = {}
+        self._seq = itertools.count()
+        self._order = {}  # ترتيب الظهور الأول لكسر التعادل
+
+    def __len__(self):
+        return len(self.products)
+
+    def clear(self):
+        self.products = {}
+        self._keys = {}
+        self._lists = {}
+        self._order = {}
+
+    def update(self, doc_id, product):
+        """إضافة منتج أو تحديثه"""
+        self.remove(doc_id, forget=False)
+
+        if doc_id not in self._order:
+            self._order[doc_id] = next(self._seq)
+        sort_key = (-product["rating"], self._order[doc_id], doc_id)
+
+        category = str(product.get("category", "")).lower().strip()
+        band = price_band(product.get("price", 0.0))
+        list_keys = ((None, None), (category, None), (None, band), (category, band))
+
+        for list_key in list_keys:
+            insort(self._lists.setdefault(list_key, []), sort_key)
+
+        self.products[doc_id] = product
+        self._keys[doc_id] = (sort_key, list_keys)
+
+    def remove(self, doc_id, forget=True):
+        """حذف منتج من كل القوائم"""
+        entry = self._keys.pop(doc_id, None)
+        if entry is None:
+            return
+        sort_key, list_keys = entry
+        for list_key in list_keys:
+            entries = self._lists[list_key]
+            del entries[bisect_left(entries, sort_key)]
+            if not entries:
+                del self._lists[list_key]
+        del self.products[doc_id]
+        if forget:
+            self._order.pop(doc_id, None)
+
+    def top(self, n=5, category=None, min_price=None, max_price=None):
+        """أفضل N منتجات حسب التقييم مع فلاتر اختيارية"""
+        if category is not None:
+            category = str(category).lower().strip()
+
+        if min_price is None and max_price is None:
+            entries = self._lists.get((category, None), [])
+            return [self.products[key[2]] for key in entries[:n]]
+
+        low = min_price if min_price is not None else PRICE_BANDS[0]
+        first_band = price_band(low)
+        last_band = price_band(max_price) if max_price is not None else len(PRICE_BANDS) - 1
+        streams = [
+            self._lists[(category, band)]
+            for band in range(first_band, last_band + 1)
+            if (category, band) in self._lists
+        ]
+
+        results = []
+        for key in heapq.merge(*streams):
+            product = self.products[key[2]]
+            # الشرائح الطرفية قد تحتوي أسعاراً خارج المدى
+            if min_price is not None and product["price"] < min_price:
+                continue
+            if max_price is not None and product["price"] > max_price:
+                continue
+            results.append(product)
+            if len(results) >= n:
+                break
+        return results
+
+    def top_in_categories(self, n, categories):
+        """أفضل N منتجات من عدة تصنيفات معاً (دمج قوائمها المرتبة)"""
+        streams = []
+        for category in {str(c).lower().strip() for c in categories}:
+            if (category, None) in self._lists:
+                streams.append(self._lists[(category, None)])
+        return [self.products[key[2]] for key in itertools.islice(heapq.merge(*streams), n)]
+
+
+class CatalogSnapshot:
+    """
+    كتالوج منتجات منظف في الذاكرة
+
+    - وضع الاستماع: مستمع on_snapshot يطبق التغييرات فور حدوثها، وإذا
+      توقف أو فشل يتحول الكتالوج لوضع السحب (سكوته وحده لا يسبب أي قراءة)
+    - وضع السحب: استعلام دوري عن المنتجات التي تغير updated_at لها
+      بعد آخر مزامنة، مع إعادة تحميل كاملة دورية لالتقاط الحذف
+    """
+
+    def __init__(self, db, cleaner, collection="products", max_staleness=30.0,
+                 full_reload_interval=600.0, listen=True, ready_timeout=10.0,
+                 clock=time.monotonic):
+        self.db = db
+        self.cleaner = cleaner  # دالة (doc_id, data) -> منتج منظف
+        self.collection = collection
+        self.max_staleness = max_staleness
+        self.full_reload_interval = full_reload_interval
+        self.listen = listen
+        self.ready_timeout = ready_timeout
+        self.clock = clock
+
+        self.products = {}
+        self.index = RatingIndex()
+        self.stats = {
+            "hits": 0,
+            "refreshes": 0,
+            "full_loads": 0,
+            "docs_read": 0,
+            "listener_events": 0
+        }
+
+        self._lock = threading.RLock()
+        self._start_lock = threading.Lock()
+        self._ready = threading.Event()
+        self._watch = None
+        self._listener_error = None  # آخر خطأ في المستمع (يوقف وضع الاستماع)
+        self._last_snapshot_at = None  # وقت آخر استدعاء من المستمع
+        self._started = False
+        self._last_sync = None
+        self._last_full_load = None
+        self._cursor = None  # أكبر قيمة updated_at تمت رؤيتها
+
+    # --- واجهة القراءة ---
+
+    def get_products(self):
+        """جميع المنتجات المنظفة (من الذاكرة)"""
+        self.ensure_fresh()
+        with self._lock:
+            return list(self.products.values())
+
+    def get_product(self, product_id):
+        self.ensure_fresh()
+        with self._lock:
+            return self.products.get(product_id)
+
+    def top_rated(self, n=5, category=None, min_price=None, max_price=None):
+        """أفضل N منتجات حسب التقييم من الفهرس المرتب مسبقاً"""
+        self.ensure_fresh()
+        with self._lock:
+            return self.index.top(n, category, min_price, max_price)
+
+    async def ensure_fresh_async(self):
+        """
+        ensure_fresh بدون حجز حلقة asyncio: مع مستمع يعمل لا يوجد ما يُنتظر،
+        وإلا تتم المزامنة (عبر العميل المتزامن) في خيط منفصل
+        """
+        if self._started and self.listener_active():
+            self.stats["hits"] += 1
+            return
+        await asyncio.get_running_loop().run_in_executor(None, self.ensure_fresh)
+
+    async def get_products_async(self):
+        await self.ensure_fresh_async()
+        with self._lock:
+            return list(self.products.values())
+
+    async def get_product_async(self, product_id):
+        await self.ensure_fresh_async()
+        with self._lock:
+            return self.products.get(product_id)
+
+    async def top_rated_async(self, n=5, category=None, min_price=None, max_price=None):
+        await self.ensure_fresh_async()
+        with self._lock:
+            return self.index.top(n, category, min_price, max_price)
+
+    def staleness(self):
+        """
+        عدد الثواني منذ آخر مزامنة: لقطة من المستمع أو سحب (None إذا لم يحمل بعد)
+        مع مستمع يعمل هذه مدة سكوته، للمراقبة فقط ولا تسبب إعادة تحميل
+        """
+        if self._last_sync is None:
+            return None
+        return self.clock() - self._last_sync
+
+    def listener_active(self):
+        """هل المستمع يعمل (موجود، لم يُبلغ عن خطأ، ولم ينقطع اتصاله)"""
+        watch = self._watch
+        return (watch is not None and self._listener_error is None
+                and getattr(watch, "is_active", True))
+
+    def hit_rate(self):
+        total = self.stats["hits"] + self.stats["refreshes"] + self.stats["full_loads"]
+        return self.stats["hits"] / total if total else 0.0
+
+    # --- المزامنة ---
+
+    def ensure_fresh(self):
+        """التأكد من أن النسخة ضمن حد التقادم المسموح"""
+        if not self._started:
+            with self._start_lock:
+                if not self._started:
+                    self._start()
+                    self._started = True
+                    return
+
+        with self._lock:
+            action = self._pending_sync()
+            if action is None:
+                self.stats["hits"] += 1
+            elif action == "full":
+                self._full_load()
+            else:
+                self._poll_changes()
+
+    def _pending_sync(self):
+        """نوع المزامنة المطلوبة الآن: None (النسخة حديثة) أو full أو poll"""
+        if self._watch is not None:
+            if self.listener_active():
+                return None  # المستمع يدفع كل تغيير، وسكوته يعني أن المجموعة لم تتغير
+            print(f"⚠️ توقف المستمع ({self._listener_error or 'انقطع الاتصال'})، التحويل للسحب الدوري")
+            self._stop_listener()
+            return "full"  # تغييرات ما بعد آخر لقطة سليمة غير معروفة
+        now = self.clock()
+        if self._last_sync is not None and now - self._last_sync <= self.max_staleness:
+            return None
+        if (self._last_full_load is None or self._cursor is None
+                or now - self._last_full_load >= self.full_reload_interval):
+            return "full"
+        return "poll"
+
+    def _start(self):
+        collection_ref = self.db.collection(self.collection)
+
+        if self.listen and hasattr(collection_ref, "on_snapshot"):
+            try:
+                self._watch = collection_ref.on_snapshot(self._on_snapshot)
+                # اللقطة الأولى قد تصل من خيط آخر
+                if self._ready.wait(self.ready_timeout):
+                    self.stats["full_loads"] += 1
+                    self._last_full_load = self._last_sync
+                    return
+                print("⚠️ لم تصل اللقطة الأولى من المستمع، التحويل للسحب الدوري")
+                self._watch.unsubscribe()
+            except Exception as e:
+                print(f"⚠️ فشل تشغيل المستمع: {e}")
+            self._watch = None
+
+        self._full_load()
+
+    def _on_snapshot(self, col_snapshot, changes, read_time):
+        """استقبال التغييرات من مستمع Firestore"""
+        with self._lock:
+            self._last_snapshot_at = self.clock()
+            try:
+                for change in changes:
+                    doc = change.document
+                    if change.type.name == "REMOVED":
+                        self._remove(doc.id)
+                    else:
+                        self._upsert(doc.id, doc.to_dict() or {})
+                    self.stats["listener_events"] += 1
+                    self.stats["docs_read"] += 1
+            except Exception as e:
+                # لقطة ناقصة: لا نعتبر النسخة متزامنة، والقراءة التالية تتحول للسحب
+                self._listener_error = e
+                self._ready.set()
+                return
+            self._last_sync = self._last_snapshot_at
+            self._ready.set()
+
+    def _full_load(self):
+        """تحميل كامل للمجموعة"""
+        docs = [(doc.id, doc.to_dict() or {}) for doc in self.db.collection(self.collection).stream()]
+        self._apply_full_load(docs)
+
+    def _apply_full_load(self, docs):
+        with self._lock:
+            self._reset()
+            for doc_id, data in docs:
+                self._upsert(doc_id, data)
+            self.stats["docs_read"] += len(docs)
+            now = self.clock()
+            self._last_sync = now
+            self._last_full_load = now
+            self.stats["full_loads"] += 1
+            self._ready.set()
+
+    def _changes_query(self):
+        return self.db.collection(self.collection).where("updated_at", ">=", self._cursor)
+
+    def _poll_changes(self):
+        """جلب المنتجات المعدلة فقط منذ آخر مزامنة"""
+        docs = [(doc.id, doc.to_dict() or {}) for doc in self._changes_query().stream()]
+        self._apply_changes(docs)
+
+    def _apply_changes(self, docs):
+        with self._lock:
+            # الحذف الناعم (deleted=True) يصل عبر نفس الاستعلام
+            for doc_id, data in docs:
+                self._upsert(doc_id, data)
+            self.stats["docs_read"] += len(docs)
+            self._last_sync = self.clock()
+            self.stats["refreshes"] += 1
+
+    def _reset(self):
+        self.products = {}
+        self.index.clear()
+        self._cursor = None
+
+    def _upsert(self, doc_id, data):
+        if data.get("deleted"):
+            self._remove(doc_id)
+            return
+        product = self.cleaner(doc_id, data)
+        self.products[doc_id] = product
+        self.index.update(doc_id, product)
+
+        updated_at = data.get("updated_at")
+        if updated_at is not None:
+            try:
+                if self._cursor is None or updated_at > self._cursor:
+                    self._cursor = updated_at
+            except TypeError:
+                pass
+
+    def _remove(self, doc_id):
+        self.products.pop(doc_id, None)
+        self.index.remove(doc_id)
+
+    def _stop_listener(self):
+        watch, self._watch = self._watch, None
+        if watch is not None:
+            try:
+                watch.unsubscribe()
+            except Exception:
+                pass  # المستمع متوقف أصلاً
+
+    def close(self):
+        """إيقاف المستمع"""
+        with self._lock:
+            self._stop_listener()
+
+
+class AsyncCatalogSnapshot(CatalogSnapshot):
+    """
+    نفس الكتالوج لكن التحميل والسحب عبر AsyncClient
+
+    عميل Firestore غير المتزامن لا يدعم المستمعين، لذلك تعمل
+    هذه النسخة دائماً بوضع السحب الدوري. إذا توفر عميل متزامن فالأفضل
+    CatalogSnapshot بمستمع عليه مع ensure_fresh_async/top_rated_async.
+    """
+
+    def __init__(self, db, cleaner, **kwargs):
+        kwargs["listen"] = False
+        super().__init__(db, cleaner, **kwargs)
+        self._refresh_lock = asyncio.Lock()
+
+    async def ensure_fresh_async(self):
+        """نسخة غير متزامنة من ensure_fresh، طلب شبكة واحد فقط عند التقادم"""
+        if self._pending_sync() is None:
+            self.stats["hits"] += 1
+            return
+
+        async with self._refresh_lock:
+            action = self._pending_sync()
+            if action is None:
+                self.stats["hits"] += 1
+            elif action == "full":
+                stream = self.db.collection(self.collection).stream()
+                self._apply_full_load([(doc.id, doc.to_dict() or {}) async for doc in stream])
+            else:
+                stream = self._changes_query().stream()
+                self._apply_changes([(doc.id, doc.to_dict() or {}) async for doc in stream])
+            self._started = True
+
+    def ensure_fresh(self):
+        # المزامنة المتزامنة ستستدعي stream() غير المتزامن من AsyncClient
+        raise TypeError("AsyncCatalogSnapshot requires await ensure_fresh_async()")
+
+    def get_products(self):
+        raise TypeError("AsyncCatalogSnapshot requires await get_products_async()")
+
+    def get_product(self, product_id):
+        raise TypeError("AsyncCatalogSnapshot requires await get_product_async()")
+
+    def top_rated(self, n=5, category=None, min_price=None, max_price=None):
+        raise TypeError("AsyncCatalogSnapshot requires await top_rated_async()")
+
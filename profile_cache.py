@@ -0,0 +1,162 @@
+"""
+كاش لملفات المستخدمين (الاهتمامات بعد التوحيد)
+LRU بحجم أقصى + مدة صلاحية، مع إبطال عند تغير مستند المستخدم في Firestore
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class UserProfileCache:
+    def __init__(self, max_size=10000, ttl=300.0, max_watches=500, clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl  # بالثواني
+        self.max_watches = max_watches  # حد المستمعين المفتوحين على مستندات المستخدمين
+        self.clock = clock
+
+        self._entries = OrderedDict()  # user_id -> (وقت الانتهاء، الملف)
+        self._watches = {}  # user_id -> مستمع on_snapshot
+        self._lock = threading.RLock()
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0
+        }
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, user_id):
+        return self.get(user_id, count=False) is not None
+
+    def get(self, user_id, count=True):
+        """الملف المخزن أو None إذا لم يكن موجوداً أو انتهت صلاحيته"""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] <= self.clock():
+                self._drop(user_id)
+                self.stats["expirations"] += 1
+                entry = None
+
+            if entry is None:
+                if count:
+                    self.stats["misses"] += 1
+                return None
+
+            self._entries.move_to_end(user_id)
+            if count:
+                self.stats["hits"] += 1
+            return entry[1]
+
+    def put(self, user_id, profile):
+        with self._lock:
+            self._entries[user_id] = (self.clock() + self.ttl, profile)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.stats["evictions"] += 1
+
+    def invalidate(self, user_id):
+        """حذف ملف المستخدم من الكاش مع تحرير مستمعه (يُستدعى عند تغير المستند)"""
+        with self._lock:
+            if user_id in self._entries:
+                self.stats["invalidations"] += 1
+            self._drop(user_id)
+
+    def watch(self, db, user_id, collection="users", loader=None):
+        """
+        تسجيل مستمع on_snapshot على مستند المستخدم يبطل الكاش عند أي تغيير
+        بدون مستمع (أو عند تجاوز الحد) تبقى مدة الصلاحية هي الضمان الوحيد
+
+        اللقطة الأولى قد تحمل تغييراً حدث بين القراءة وتسجيل المستمع، لذلك
+        تُحدّث الملف المخزن عبر loader (لقطة المستند -> الملف) أو تبطله بدونها
+        """
+        with self._lock:
+            if user_id in self._watches:
+                return False
+            if len(self._watches) >= self.max_watches:
+                self._release_orphans()
+                if len(self._watches) >= self.max_watches:
+                    return False
+            self._watches[user_id] = None  # حجز المكان قبل فتح المستمع
+
+        initial = [True]
+        registered = []  # المستمع بعد فتحه (لتجاهل مستمع قديم تم تحريره)
+
+        def on_change(doc_snapshots, changes, read_time):
+            with self._lock:
+                if registered and self._watches.get(user_id) is not registered[0]:
+                    return
+                if initial[0]:
+                    initial[0] = False
+                    if loader is not None and doc_snapshots:
+                        self._refresh(user_id, loader(doc_snapshots[0]))
+                    elif self._entries.pop(user_id, None) is not None:
+                        # بدون loader: نبطل الملف ونبقي المستمع للقراءة التالية
+                        self.stats["invalidations"] += 1
+                    return
+            self.invalidate(user_id)
+
+        try:
+            watch = db.collection(collection).document(user_id).on_snapshot(on_change)
+        except Exception as e:
+            print(f"⚠️ تعذر تسجيل مستمع للمستخدم {user_id}: {e}")
+            with self._lock:
+                self._watches.pop(user_id, None)
+            return False
+
+        with self._lock:
+            if user_id in self._watches:
+                self._watches[user_id] = watch
+                registered.append(watch)
+                return True
+        # تم حذف المستخدم من الكاش أثناء التسجيل
+        watch.unsubscribe()
+        return False
+
+    def _refresh(self, user_id, profile):
+        """استبدال ملف مخزن بنسخة أحدث (بدون تغيير مدة صلاحيته أو ترتيبه)"""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                self._entries[user_id] = (entry[0], profile)
+
+    def _drop(self, user_id):
+        self._entries.pop(user_id, None)
+        watch = self._watches.pop(user_id, None)
+        if watch is not None:
+            _release(watch)
+
+    def _release_orphans(self):
+        """تحرير مستمعي المستخدمين الذين لم يعد لهم ملف في الكاش"""
+        for user_id in [u for u, watch in self._watches.items() if watch is not None and u not in self._entries]:
+            _release(self._watches.pop(user_id))
+
+    def hit_rate(self):
+        total = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / total if total else 0.0
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self.stats, size=len(self._entries), watches=len(self._watches),
+                        hit_rate=round(self.hit_rate(), 4))
+
+    def clear(self):
+        with self._lock:
+            for user_id in list(self._entries):
+                self._drop(user_id)
+            for watch in self._watches.values():
+                if watch is not None:
+                    _release(watch)
+            self._watches.clear()
+
+
+def _release(watch):
+    """
+    إيقاف مستمع في خيط منفصل: الإبطال يأتي غالباً من داخل استدعاء المستمع نفسه،
+    و unsubscribe في Firestore ينتظر انتهاء خيط المستمع (لا يمكن من داخله)
+    """
+    threading.Thread(target=watch.unsubscribe, name="profile-cache-unwatch", daemon=True).start()
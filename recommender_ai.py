@@ -1,6 +1,12 @@
 import firebase_admin
 from firebase_admin import firestore
 import random
+import threading
+from product_catalog import AsyncCatalogSnapshot, CatalogSnapshot
+
+# نسخة كتالوج مشتركة لكل (عميل Firestore، نوع الكتالوج)
+_catalogs = {}
+_catalogs_lock = threading.Lock()
 
 # دالة لتنظيف بيانات المنتج (Defensive Programming)
 # هذه الدالة تحل مشكلة P004 التي رأيناها في الصورة (الاسم الفارغ)
@@ -28,31 +34,53 @@ def clean_product_data(doc_id, data):
         "description": data.get('description', 'No description available')
     }
 
+def get_catalog(db, catalog_class=CatalogSnapshot, **options):
+    """نسخة الكتالوج المشتركة لعميل Firestore المعطى (تُنشأ عند أول طلب)"""
+    key = (id(db), catalog_class)
+    with _catalogs_lock:
+        catalog = _catalogs.get(key)
+        if catalog is None or catalog.db is not db:
+            catalog = catalog_class(db, clean_product_data, **options)
+            _catalogs[key] = catalog
+        return catalog
+
 def get_recommendations(user_id, db):
     print(f"--- جاري حساب التوصيات للمستخدم: {user_id} ---")
     
     recommendations = []
     
     try:
-        # 1. جلب كل المنتجات من Firebase
-        products_ref = db.collection('products')
-        docs = products_ref.stream()
-        
-        all_products = []
-        for doc in docs:
-            # ننظف كل منتج فوراً
-            clean_item = clean_product_data(doc.id, doc.to_dict())
-            all_products.append(clean_item)
+        # 1. المنتجات المنظفة من نسخة الكتالوج في الذاكرة
+        # (لا قراءة من Firebase إلا عند التحديث)
+        catalog = get_catalog(db)
 
         # 2. المنطق البسيط للتوصية
-        # نرتب المنتجات حسب التقييم (الأعلى أولاً) لضمان ظهور أفضل المنتجات
-        sorted_products = sorted(all_products, key=lambda x: x['rating'], reverse=True)
-        
-        # نأخذ أول 5 منتجات فقط
-        recommendations = sorted_products[:5]
+        # أفضل 5 منتجات حسب التقييم مباشرة من الفهرس المرتب مسبقاً
+        recommendations = catalog.top_rated(5)
+
+    except Exception as e:
+        print(f"Error getting recommendations: {e}")
+        return []
+
+    return recommendations
+
+async def get_recommendations_async(user_id, db, listener_db=None):
+    """
+    نسخة غير متزامنة من get_recommendations (نفس النتيجة: أفضل 5 حسب التقييم)
+    listener_db: عميل متزامن اختياري يشغل مستمع الكتالوج، وبدونه يُسحب
+    الكتالوج دورياً عبر AsyncClient (db)
+    """
+    recommendations = []
+
+    try:
+        if listener_db is not None:
+            catalog = get_catalog(listener_db)
+        else:
+            catalog = get_catalog(db, AsyncCatalogSnapshot)
+        recommendations = await catalog.top_rated_async(5)
 
     except Exception as e:
         print(f"Error getting recommendations: {e}")
         return []
 
-    return recommendations
\ No newline at end of file
+    return recommendations
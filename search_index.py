@@ -0,0 +1,185 @@
+"""
+فهرس بحث نصي لعناصر المحتوى
+- تطبيع عربي (توحيد الألف والياء والتاء المربوطة وحذف التشكيل)
+- قوائم n-gram للبحث الجزئي داخل النص، وقوائم كلمات للبحث بالبادئة أثناء الكتابة
+- نفس أوزان search_items: العنوان 3، التصنيف 2، كل وسم 1
+"""
+import re
+from bisect import bisect_left, insort
+
+TITLE_WEIGHT = 3
+CATEGORY_WEIGHT = 2
+TAG_WEIGHT = 1
+
+MAX_GRAM = 3
+
+# التشكيل، الألف الخنجرية، والتطويل تُحذف، والحروف التالية تُوحَّد
+_DIACRITICS = "\u064B\u064C\u064D\u064E\u064F\u0650\u0651\u0652\u0670\u0640"
+_ARABIC_FOLDING = {
+    "أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا",
+    "ى": "ي", "ئ": "ي",
+    "ؤ": "و",
+    "ة": "ه",
+}
+_REPLACEMENTS = dict(_ARABIC_FOLDING, **{char: "" for char in _DIACRITICS})
+# تعبير واحد يلمس الحروف المتغيرة فقط (أسرع من translate على كل حرف)
+_NORMALIZE = re.compile(f"[{''.join(_REPLACEMENTS)}]")
+_TOKEN_SPLIT = re.compile(r"[^\w]+")
+
+
+def normalize_text(text):
+    """تطبيع النص للبحث (أحرف صغيرة + تطبيع عربي)"""
+    return _NORMALIZE.sub(lambda match: _REPLACEMENTS[match.group()], str(text).lower())
+
+
+def tokenize(text):
+    return [token for token in _TOKEN_SPLIT.split(normalize_text(text)) if token]
+
+
+def ngrams(text, size):
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+class SearchIndex:
+    def __init__(self, items=None):
+        self.items = {}
+        self._fields = {}  # item -> (العنوان، التصنيف، الوسوم) بعد التطبيع
+        self._order = {}  # ترتيب الإدخال لكسر التعادل كما في البحث القديم
+        self._next_order = 0
+        self._grams = {}  # n-gram -> عناصر
+        self._item_grams = {}
+        self._tokens = {}  # كلمة -> {عنصر: أعلى وزن}
+        self._item_tokens = {}
+        self._sorted_tokens = []
+
+        for name, info in (items or {}).items():
+            self.add(name, info)
+
+    def __len__(self):
+        return len(self.items)
+
+    # --- التحديث ---
+
+    def add(self, name, info):
+        """إضافة عنصر أو إعادة فهرسته بعد التعديل"""
+        if name in self.items:
+            self.remove(name, keep_order=True)
+        if name not in self._order:
+            self._order[name] = self._next_order
+            self._next_order += 1
+
+        title = normalize_text(name)
+        category = normalize_text(info["category"])
+        tags = [normalize_text(tag) for tag in info["tags"]]
+        self.items[name] = info
+        self._fields[name] = (title, category, tags)
+
+        grams = set()
+        for text in [title, category] + tags:
+            for size in range(1, MAX_GRAM + 1):
+                grams |= ngrams(text, size)
+        for gram in grams:
+            self._grams.setdefault(gram, set()).add(name)
+        self._item_grams[name] = grams
+
+        weights = {}
+        for weight, text in [(TITLE_WEIGHT, name), (CATEGORY_WEIGHT, info["category"])] + [(TAG_WEIGHT, t) for t in info["tags"]]:
+            for token in tokenize(text):
+                weights[token] = max(weights.get(token, 0), weight)
+        for token, weight in weights.items():
+            if token not in self._tokens:
+                self._tokens[token] = {}
+                insort(self._sorted_tokens, token)
+            self._tokens[token][name] = weight
+        self._item_tokens[name] = list(weights)
+
+    def update(self, name, info):
+        self.add(name, info)
+
+    def remove(self, name, keep_order=False):
+        if name not in self.items:
+            return
+        for gram in self._item_grams.pop(name):
+            postings = self._grams[gram]
+            postings.discard(name)
+            if not postings:
+                del self._grams[gram]
+        for token in self._item_tokens.pop(name):
+            postings = self._tokens[token]
+            postings.pop(name, None)
+            if not postings:
+                del self._tokens[token]
+                del self._sorted_tokens[bisect_left(self._sorted_tokens, token)]
+        del self.items[name]
+        del self._fields[name]
+        if not keep_order:
+            self._order.pop(name, None)
+
+    # --- البحث ---
+
+    def _candidates(self, query):
+        """العناصر التي تحتوي كل n-grams الاستعلام (مرشحة للمطابقة الجزئية)"""
+        size = min(len(query), MAX_GRAM)
+        grams = sorted((self._grams.get(g, set()) for g in ngrams(query, size)), key=len)
+        if not grams or not grams[0]:
+            return set()
+        candidates = set(grams[0])
+        for postings in grams[1:]:
+            candidates &= postings
+            if not candidates:
+                break
+        return candidates
+
+    def search(self, query):
+        """
+        بحث جزئي (نفس نتائج search_items القديمة بعد التطبيع)
+        يرجع قائمة (العنصر، النقاط، البيانات) مرتبة حسب النقاط
+        """
+        query = normalize_text(query)
+        candidates = self._candidates(query) if query else self.items.keys()
+
+        results = []
+        for name in candidates:
+            title, category, tags = self._fields[name]
+            score = 0
+            if query in title:
+                score += TITLE_WEIGHT
+            if query in category:
+                score += CATEGORY_WEIGHT
+            for tag in tags:
+                if query in tag:
+                    score += TAG_WEIGHT
+            if score > 0:
+                results.append((name, score, self.items[name]))
+
+        results.sort(key=lambda x: (-x[1], self._order[x[0]]))
+        return results
+
+    def search_prefix(self, text, limit=10):
+        """
+        بحث أثناء الكتابة: كل كلمة في الاستعلام تُعامل كبادئة،
+        والعنصر يجب أن يطابق كل الكلمات. النقاط مجموع أعلى وزن لكل كلمة
+        """
+        prefixes = tokenize(text)
+        if not prefixes:
+            return []
+
+        scores = None
+        for prefix in prefixes:
+            matches = {}
+            position = bisect_left(self._sorted_tokens, prefix)
+            while position < len(self._sorted_tokens) and self._sorted_tokens[position].startswith(prefix):
+                for name, weight in self._tokens[self._sorted_tokens[position]].items():
+                    if weight > matches.get(name, 0):
+                        matches[name] = weight
+                position += 1
+
+            if scores is None:
+                scores = matches
+            else:
+                scores = {name: score + matches[name] for name, score in scores.items() if name in matches}
+            if not scores:
+                return []
+
+        ranked = sorted(scores.items(), key=lambda x: (-x[1], self._order[x[0]]))
+        return [(name, score, self.items[name]) for name, score in ranked[:limit]]
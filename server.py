@@ -1,10 +1,16 @@
+import asyncio
+import heapq
 import os
 import random  # مكتبة العشوائية
 import firebase_admin
-from firebase_admin import credentials, firestore
+from firebase_admin import credentials, firestore, firestore_async
+from typing import List, Optional
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from pydantic import BaseModel
 import uvicorn
+from profile_cache import UserProfileCache
+from user_behavior import ACTION_WEIGHTS
 
 app = FastAPI()
 
@@ -23,7 +29,37 @@ if not firebase_admin._apps:
     except Exception as e:
         print(f"Error initializing Firebase: {e}")
 
-db = firestore.client()
+# عميل غير متزامن حتى لا تحجز قراءات Firestore خيوط السيرفر
+db = firestore_async.client()
+
+# العميل المتزامن يُستخدم فقط لمستمعي on_snapshot (غير متوفرة في AsyncClient)
+try:
+    listener_db = firestore.client()
+except Exception as e:
+    print(f"Listeners disabled: {e}")
+    listener_db = None
+
+# كاش اهتمامات المستخدمين: حجم أقصى + مدة صلاحية + إبطال عند تغير المستند
+profile_cache = UserProfileCache(
+    max_size=int(os.environ.get("PROFILE_CACHE_SIZE", 10000)),
+    ttl=float(os.environ.get("PROFILE_CACHE_TTL", 300))
+)
+
+# توصيات تحليل المصفوفة (اختيارية): مسار نموذج مدرب عبر matrix_factorization.py
+# من سجل INTERACTION_LOG الذي يكتبه POST /interactions، لذلك عناصر النموذج
+# هي معرفات المنتجات في products_db ومستخدموه هم معرفات مستخدمي Firestore
+interaction_log = None
+if os.environ.get("INTERACTION_LOG"):
+    from analytics import InteractionLog
+    interaction_log = InteractionLog(os.environ["INTERACTION_LOG"])
+
+mf_model = None
+if os.environ.get("MF_MODEL_DIR"):
+    try:
+        from matrix_factorization import MFRecommender
+        mf_model = MFRecommender(os.environ["MF_MODEL_DIR"])
+    except Exception as e:
+        print(f"Matrix factorization disabled: {e}")
 
 products_db = [
     {"id": "1", "name": "Gaming Laptop HP", "category": "tech", "price": 1200.0},
@@ -34,29 +70,111 @@ products_db = [
     {"id": "6", "name": "Smart Watch", "category": "tech", "price": 200.0},
 ]
 
+def build_category_index(products):
+    """فهرس معكوس: التصنيف (أحرف صغيرة) -> مواقع المنتجات في products_db"""
+    index = {}
+    for position, p in enumerate(products):
+        index.setdefault(p["category"].lower().strip(), []).append(position)
+    return index
+
+# يُبنى مرة واحدة عند التشغيل (أعد بناءه بعد تحميل منتجات جديدة)
+category_index = build_category_index(products_db)
+products_by_id = {p["id"]: p for p in products_db}
+
+def products_for_interests(interests):
+    """اتحاد قوائم التصنيفات المطلوبة بنفس ترتيب products_db"""
+    postings = [category_index[c] for c in set(interests) if c in category_index]
+    if len(postings) == 1:
+        return [products_db[position] for position in postings[0]]
+    return [products_db[position] for position in heapq.merge(*postings)]
+
+# الحد الأقصى لعدد المستخدمين في طلب دفعة واحد
+MAX_BATCH_SIZE = 500
+INTERACTION_ACTIONS = set(ACTION_WEIGHTS) | {"watch"}
+
+class BatchRecommendRequest(BaseModel):
+    user_ids: List[str]
+
+class InteractionRequest(BaseModel):
+    user_id: str
+    product_id: str
+    action: str
+    duration: Optional[float] = None  # بالثواني، لـ watch فقط
+
+def extract_interests(user_doc):
+    """الاهتمامات بعد التوحيد (أحرف صغيرة بدون مسافات)"""
+    interests = []
+    if user_doc.exists:
+        user_data = user_doc.to_dict()
+        raw_interests = user_data.get("interests", [])
+        if isinstance(raw_interests, list):
+            interests = [str(i).lower().strip() for i in raw_interests]
+    return interests
+
+def profile_from_snapshot(user_doc):
+    """الملف المخزن في الكاش من لقطة مستند المستخدم"""
+    return tuple(extract_interests(user_doc))
+
+def validate_user_id(user_id):
+    """رسالة خطأ إذا كان المعرف غير صالح كمعرف مستند Firestore"""
+    if not isinstance(user_id, str) or not user_id.strip():
+        return "user_id فارغ"
+    if "/" in user_id or user_id in (".", ".."):
+        return f"user_id غير صالح: {user_id}"
+    if len(user_id.encode("utf-8")) > 1500:
+        return "user_id طويل جداً"
+    return None
+
+def cache_interests(user_id, interests):
+    """حفظ الاهتمامات في الكاش وتسجيل مستمع الإبطال في الخلفية"""
+    profile_cache.put(user_id, tuple(interests))
+    if listener_db is not None:
+        asyncio.get_running_loop().run_in_executor(
+            None, profile_cache.watch, listener_db, user_id, "users", profile_from_snapshot
+        )
+
+async def get_user_interests(user_id):
+    """الاهتمامات من الكاش، أو من Firestore عند عدم وجودها"""
+    cached = profile_cache.get(user_id)
+    if cached is not None:
+        return list(cached)
+
+    user_doc = await db.collection("users").document(user_id).get()
+    interests = extract_interests(user_doc)
+    cache_interests(user_id, interests)
+    return interests
+
 @app.get("/")
 def home():
     return {"status": "Online", "message": "AI Recommender Server is Running!"}
 
+@app.get("/stats/profile-cache")
+def profile_cache_stats():
+    return profile_cache.get_stats()
+
 @app.get("/recommend/{user_id}")
-def recommend_products(user_id: str):
+async def recommend_products(user_id: str):
     try:
-        user_ref = db.collection("users").document(user_id)
-        user_doc = user_ref.get()
+        if mf_model is not None and user_id in mf_model:
+            # نطلب أكثر من 3 لأن بعض منتجات النموذج قد تكون حُذفت من الكتالوج
+            recommended_items = [
+                products_by_id[product_id] for product_id in mf_model.recommend(user_id, 10)
+                if product_id in products_by_id
+            ][:3]
+            if recommended_items:
+                return {
+                    "status": "success",
+                    "source": "Matrix Factorization",
+                    "user_id": user_id,
+                    "found_interests": list(profile_cache.get(user_id, count=False) or []),
+                    "recommendations": recommended_items
+                }
 
-        interests = []
-        if user_doc.exists:
-            user_data = user_doc.to_dict()
-            raw_interests = user_data.get("interests", [])
-            if isinstance(raw_interests, list):
-                interests = [str(i).lower().strip() for i in raw_interests]
+        interests = await get_user_interests(user_id)
 
         recommended_items = []
         if interests:
-            recommended_items = [
-                p for p in products_db 
-                if p["category"].lower() in interests
-            ]
+            recommended_items = products_for_interests(interests)
 
         # --- التعديل الذي طلبته (عشوائي) ---
         if not recommended_items:
@@ -76,6 +194,88 @@ def recommend_products(user_id: str):
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
+@app.post("/interactions")
+async def record_interaction(request: InteractionRequest):
+    """تسجيل تفاعل مستخدم مع منتج في سجل التدريب (INTERACTION_LOG)"""
+    error = validate_user_id(request.user_id)
+    if error:
+        return {"status": "error", "message": error}
+    if request.product_id not in products_by_id:
+        return {"status": "error", "message": f"منتج غير معروف: {request.product_id}"}
+    if request.action not in INTERACTION_ACTIONS:
+        return {"status": "error", "message": f"تفاعل غير معروف: {request.action}"}
+    if interaction_log is None:
+        return {"status": "error", "message": "سجل التفاعلات غير مفعل (INTERACTION_LOG)"}
+    interaction_log.write(request.user_id, request.product_id, request.action, request.duration)
+    return {"status": "success"}
+
+@app.on_event("shutdown")
+def close_interaction_log():
+    if interaction_log is not None:
+        interaction_log.close()
+
+@app.post("/recommend/batch")
+async def recommend_batch(request: BatchRecommendRequest):
+    """توصيات لعدة مستخدمين: قراءة واحدة لكل المستخدمين ثم الفهرس لكل منهم"""
+    user_ids = list(dict.fromkeys(request.user_ids))  # حذف التكرار مع الحفاظ على الترتيب
+    if len(user_ids) > MAX_BATCH_SIZE:
+        return {"status": "error", "message": f"الحد الأقصى {MAX_BATCH_SIZE} مستخدم في الطلب"}
+
+    results = {}
+    valid_ids = []
+    for user_id in user_ids:
+        error = validate_user_id(user_id)
+        if error:
+            results[user_id] = {"status": "error", "message": error}
+        else:
+            valid_ids.append(user_id)
+
+    try:
+        # 1. المستخدمون الموجودون في الكاش لا يحتاجون قراءة
+        interests_by_user = {}
+        missing_ids = []
+        for user_id in valid_ids:
+            cached = profile_cache.get(user_id)
+            if cached is not None:
+                interests_by_user[user_id] = list(cached)
+            else:
+                missing_ids.append(user_id)
+
+        # جلب الباقي في طلب شبكة واحد
+        refs = [db.collection("users").document(user_id) for user_id in missing_ids]
+        if refs:
+            async for user_doc in db.get_all(refs):
+                try:
+                    interests_by_user[user_doc.id] = extract_interests(user_doc)
+                    cache_interests(user_doc.id, interests_by_user[user_doc.id])
+                except Exception as e:
+                    results[user_doc.id] = {"status": "error", "message": str(e)}
+
+        # 2. التوصيات من الفهرس المعكوس (التكلفة حسب حجم النتيجة فقط)
+        for user_id, interests in interests_by_user.items():
+            recommended_items = products_for_interests(interests)
+            if not recommended_items:
+                count = min(len(products_db), 3)
+                recommended_items = random.sample(products_db, count)
+            results[user_id] = {
+                "status": "success",
+                "found_interests": interests,
+                "recommendations": recommended_items
+            }
+
+        # مستخدم لم يرجع في get_all (لا يحدث عادة)
+        for user_id in valid_ids:
+            results.setdefault(user_id, {"status": "error", "message": "لم يتم جلب المستخدم"})
+
+        return {
+            "status": "success",
+            "source": "Live Server Data",
+            "results": {user_id: results[user_id] for user_id in user_ids}
+        }
+
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 8085))
     uvicorn.run(app, host="0.0.0.0", port=port)
\ No newline at end of file
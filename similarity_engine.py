@@ -0,0 +1,209 @@
+"""
+محرك تشابه العناصر باستخدام NumPy و scipy.sparse
+نفس معادلة ContentDatabase.get_recommendations_by_item:
+    2 × (نفس التصنيف) + 0.5 × (عدد الوسوم المشتركة) + 0.3 × الشعبية
+"""
+import numpy as np
+from scipy import sparse
+
+CATEGORY_WEIGHT = 2
+TAG_WEIGHT = 0.5
+POPULARITY_WEIGHT = 0.3
+
+
+class ItemSimilarityEngine:
+    """
+    يرمّز العناصر مرة واحدة في مصفوفة وسوم متفرقة (عنصر × وسم)
+    ومتجه أرقام التصنيفات، ثم يحسب تشابه عنصر مع كل العناصر بعملية واحدة
+    """
+
+    def __init__(self, items, neighbors=10):
+        self.num_neighbors = neighbors
+        self.names = []
+        self.positions = {}
+        self.tag_ids = {}
+        self.category_ids = {}
+
+        rows, cols = [], []
+        categories, popularity = [], []
+        for position, (name, info) in enumerate(items.items()):
+            self.names.append(name)
+            self.positions[name] = position
+            for tag_id in self._encode_tags(info["tags"]):
+                rows.append(position)
+                cols.append(tag_id)
+            categories.append(self._encode_category(info["category"]))
+            popularity.append(info.get("popularity", 0.0))
+
+        n = len(self.names)
+        self.tags = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.float64), (rows, cols)),
+            shape=(n, len(self.tag_ids))
+        )
+        self.categories = np.array(categories, dtype=np.int64)
+        self.popularity = np.array(popularity, dtype=np.float64)
+        # معامل تطبيع الشعبية (عندما تكون القيم المخزنة غير مطبعة)
+        self.popularity_scale = 1.0
+        self.active = np.ones(n, dtype=bool)
+
+        # جدول الجيران المحسوب مسبقاً (يُبنى عند الطلب)
+        self.neighbor_ids = None
+        self.neighbor_scores = None
+
+    def _encode_tags(self, tags):
+        ids = set()
+        for tag in tags:
+            if tag not in self.tag_ids:
+                self.tag_ids[tag] = len(self.tag_ids)
+            ids.add(self.tag_ids[tag])
+        return sorted(ids)
+
+    def _encode_category(self, category):
+        if category not in self.category_ids:
+            self.category_ids[category] = len(self.category_ids)
+        return self.category_ids[category]
+
+    # --- الحساب ---
+
+    def scores(self, position):
+        """درجة تشابه العنصر مع كل العناصر (متجه واحد)"""
+        common = (self.tags @ self.tags[position].T).toarray().ravel()
+        same_category = (self.categories == self.categories[position])
+        popularity = self.popularity * self.popularity_scale
+        scores = same_category * CATEGORY_WEIGHT + common * TAG_WEIGHT + popularity * POPULARITY_WEIGHT
+        scores[position] = -np.inf
+        scores[~self.active] = -np.inf
+        return scores
+
+    def _top_positions(self, scores, num):
+        """أفضل num مواقع عبر argpartition، التعادل يُكسر بترتيب الإدخال"""
+        candidates = np.flatnonzero(np.isfinite(scores))
+        num = min(num, len(candidates))
+        if num <= 0:
+            return np.empty(0, dtype=np.int64)
+        if num < len(candidates):
+            # نأخذ كل العناصر المساوية لأصغر درجة مختارة حتى يبقى كسر التعادل ثابتاً
+            selected = np.argpartition(-scores[candidates], num - 1)[:num]
+            cutoff = scores[candidates[selected]].min()
+            candidates = candidates[scores[candidates] >= cutoff]
+        order = np.lexsort((candidates, -scores[candidates]))
+        return candidates[order[:num]]
+
+    def similar(self, item_name, num=5):
+        """أكثر العناصر تشابهاً (حساب مباشر ودقيق)"""
+        position = self.positions.get(item_name)
+        if position is None or not self.active[position]:
+            return []
+        top = self._top_positions(self.scores(position), num)
+        return [self.names[i] for i in top]
+
+    # --- جدول الجيران ---
+
+    def build_neighbors(self):
+        """حساب أفضل K جيران لكل عنصر"""
+        n = len(self.names)
+        k = self.num_neighbors
+        self.neighbor_ids = np.full((n, k), -1, dtype=np.int64)
+        self.neighbor_scores = np.full((n, k), -np.inf)
+        for position in range(n):
+            if self.active[position]:
+                self._refresh_neighbors(position)
+
+    def _refresh_neighbors(self, position, scores=None):
+        if scores is None:
+            scores = self.scores(position)
+        top = self._top_positions(scores, self.num_neighbors)
+        self.neighbor_ids[position] = -1
+        self.neighbor_scores[position] = -np.inf
+        self.neighbor_ids[position, :len(top)] = top
+        self.neighbor_scores[position, :len(top)] = scores[top]
+
+    def neighbors(self, item_name, num=None):
+        """الجيران من الجدول المحسوب مسبقاً"""
+        if self.neighbor_ids is None:
+            self.build_neighbors()
+        position = self.positions.get(item_name)
+        if position is None or not self.active[position]:
+            return []
+        ids = self.neighbor_ids[position]
+        ids = ids[ids >= 0][:num or self.num_neighbors]
+        return [self.names[i] for i in ids]
+
+    # --- التحديث ---
+
+    def update_item(self, item_name, info, popularity=None):
+        """إضافة عنصر أو تحديث وسومه/تصنيفه مع تحديث الجيران المتأثرين فقط"""
+        position = self.positions.get(item_name)
+        tag_ids = self._encode_tags(info["tags"])
+        row = sparse.csr_matrix(
+            (np.ones(len(tag_ids)), ([0] * len(tag_ids), tag_ids)),
+            shape=(1, len(self.tag_ids))
+        )
+        tags = self.tags
+        if tags.shape[1] < len(self.tag_ids):
+            tags = sparse.csr_matrix((tags.data, tags.indices, tags.indptr),
+                                     shape=(tags.shape[0], len(self.tag_ids)))
+
+        category = self._encode_category(info["category"])
+        if popularity is None:
+            popularity = info.get("popularity", 0.0)
+
+        if position is None:
+            position = len(self.names)
+            self.names.append(item_name)
+            self.positions[item_name] = position
+            self.tags = sparse.vstack([tags, row], format="csr")
+            self.categories = np.append(self.categories, category)
+            self.popularity = np.append(self.popularity, popularity)
+            self.active = np.append(self.active, True)
+            if self.neighbor_ids is not None:
+                k = self.num_neighbors
+                self.neighbor_ids = np.vstack([self.neighbor_ids, np.full((1, k), -1, dtype=np.int64)])
+                self.neighbor_scores = np.vstack([self.neighbor_scores, np.full((1, k), -np.inf)])
+        else:
+            self.tags = sparse.vstack([tags[:position], row, tags[position + 1:]], format="csr")
+            self.categories[position] = category
+            self.popularity[position] = popularity
+            self.active[position] = True
+
+        if self.neighbor_ids is not None:
+            self._refresh_affected(position)
+
+    def remove_item(self, item_name):
+        position = self.positions.get(item_name)
+        if position is None:
+            return
+        self.active[position] = False
+        if self.neighbor_ids is not None:
+            self.neighbor_ids[position] = -1
+            self.neighbor_scores[position] = -np.inf
+            self._refresh_affected(position)
+
+    def set_popularity(self, item_name, popularity):
+        """تحديث الشعبية (الجدول المحسوب يتحدث عند build_neighbors التالي)"""
+        position = self.positions.get(item_name)
+        if position is not None:
+            self.popularity[position] = popularity
+
+    def _refresh_affected(self, position):
+        """
+        إعادة حساب جيران العنصر المتغير، وجيران كل عنصر
+        كان يحتويه في جدوله أو أصبح يستحق دخوله
+        """
+        if self.active[position]:
+            self._refresh_neighbors(position)
+
+        # درجة العنصر المتغير عند كل العناصر الأخرى (المعادلة متماثلة عدا الشعبية)
+        common = (self.tags @ self.tags[position].T).toarray().ravel()
+        same_category = (self.categories == self.categories[position])
+        popularity = self.popularity[position] * self.popularity_scale
+        incoming = same_category * CATEGORY_WEIGHT + common * TAG_WEIGHT + popularity * POPULARITY_WEIGHT
+        if not self.active[position]:
+            incoming[:] = -np.inf
+
+        contains = (self.neighbor_ids == position).any(axis=1)
+        improves = incoming >= self.neighbor_scores[:, -1]
+        affected = np.flatnonzero((contains | improves) & self.active)
+        for other in affected:
+            if other != position:
+                self._refresh_neighbors(other)
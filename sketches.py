@@ -0,0 +1,157 @@
+"""
+هياكل تقريبية (sketches) لعدّ تدفق التفاعلات بذاكرة ثابتة
+- CountMinSketch: تكرار أي مفتاح، التقدير لا يقل عن الحقيقي ويزيد عليه
+  بأقل من epsilon × N باحتمال 1 − delta (N مجموع كل الإضافات)
+- HyperLogLog: عدد المفاتيح المختلفة، الخطأ المعياري النسبي ≈ 1.04 / √m
+  (m = 2^precision، الافتراضي 4096 سجلاً ≈ 1.6%)
+- SpaceSaving: العناصر الأكثر تكراراً بعدد ثابت من العدادات،
+  كل عنصر تكراره أكبر من N / capacity مضمون الوجود، والعد الزائد لا يتجاوز error
+"""
+import hashlib
+import math
+from array import array
+
+
+def _hash64(key, salt=b""):
+    digest = hashlib.blake2b(str(key).encode("utf-8"), digest_size=8, salt=salt).digest()
+    return int.from_bytes(digest, "little")
+
+
+class CountMinSketch:
+    def __init__(self, width=2048, depth=5):
+        self.width = width
+        self.depth = depth
+        self.total = 0
+        self._rows = [array("Q", bytes(8 * width)) for _ in range(depth)]
+
+    @classmethod
+    def from_error(cls, epsilon=0.001, delta=0.01):
+        """عرض e / epsilon وعمق ln(1 / delta)"""
+        return cls(width=math.ceil(math.e / epsilon), depth=math.ceil(math.log(1 / delta)))
+
+    def _columns(self, key):
+        # تجزئة مزدوجة: عمود الصف i هو h1 + i × h2
+        h = _hash64(key)
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        return [(h1 + i * h2) % self.width for i in range(self.depth)]
+
+    def add(self, key, count=1):
+        """إضافة وإرجاع التقدير الجديد"""
+        self.total += count
+        estimate = None
+        for row, column in zip(self._rows, self._columns(key)):
+            row[column] += count
+            if estimate is None or row[column] < estimate:
+                estimate = row[column]
+        return estimate
+
+    def estimate(self, key):
+        return min(row[column] for row, column in zip(self._rows, self._columns(key)))
+
+    def error_bound(self):
+        """أقصى زيادة متوقعة في التقدير (باحتمال 1 − e^−depth)"""
+        return math.e / self.width * self.total
+
+    def memory_bytes(self):
+        return 8 * self.width * self.depth
+
+
+class HyperLogLog:
+    def __init__(self, precision=12):
+        self.precision = precision
+        self.m = 1 << precision
+        self._registers = bytearray(self.m)
+        if self.m >= 128:
+            self._alpha = 0.7213 / (1 + 1.079 / self.m)
+        else:
+            self._alpha = {16: 0.673, 32: 0.697, 64: 0.709}[self.m]
+
+    def add(self, key):
+        h = _hash64(key, salt=b"hll")
+        index = h & (self.m - 1)
+        rest = h >> self.precision
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self._registers[index]:
+            self._registers[index] = rank
+
+    def count(self):
+        estimate = self._alpha * self.m * self.m / sum(2.0 ** -r for r in self._registers)
+        zeros = self._registers.count(0)
+        if estimate <= 2.5 * self.m and zeros:
+            # العد الخطي للأعداد الصغيرة
+            estimate = self.m * math.log(self.m / zeros)
+        return int(round(estimate))
+
+    def __len__(self):
+        return self.count()
+
+    def merge(self, other):
+        for i, rank in enumerate(other._registers):
+            if rank > self._registers[i]:
+                self._registers[i] = rank
+
+    def relative_error(self):
+        return 1.04 / math.sqrt(self.m)
+
+    def memory_bytes(self):
+        return self.m
+
+
+class SpaceSaving:
+    """
+    خوارزمية Space-Saving بهيكل "ملخص التدفق": العناصر مجمعة حسب العدد
+    فالزيادة والاستبدال O(1)
+    """
+
+    def __init__(self, capacity=100):
+        self.capacity = capacity
+        self._counts = {}  # العنصر -> العدد
+        self._errors = {}  # العنصر -> أقصى زيادة في العدد
+        self._buckets = {}  # العدد -> {العنصر: None} بترتيب الدخول
+        self._min = 0
+
+    def __len__(self):
+        return len(self._counts)
+
+    def _move(self, item, old, new):
+        if old:
+            self._drop(item, old)
+        self._buckets.setdefault(new, {})[item] = None
+
+    def add(self, item):
+        count = self._counts.get(item)
+        if count is not None:
+            self._counts[item] = count + 1
+            self._move(item, count, count + 1)
+            if count == self._min and count not in self._buckets:
+                self._min = count + 1
+            return
+
+        if len(self._counts) < self.capacity:
+            self._counts[item] = 1
+            self._errors[item] = 0
+            self._move(item, 0, 1)
+            self._min = 1
+            return
+
+        # استبدال أقدم عنصر من أصحاب أقل عدد
+        victim = next(iter(self._buckets[self._min]))
+        del self._counts[victim]
+        del self._errors[victim]
+        self._drop(victim, self._min)
+        self._counts[item] = self._min + 1
+        self._errors[item] = self._min
+        self._move(item, 0, self._min + 1)
+        if self._min not in self._buckets:
+            self._min += 1
+
+    def _drop(self, item, count):
+        bucket = self._buckets[count]
+        del bucket[item]
+        if not bucket:
+            del self._buckets[count]
+
+    def top(self, limit=10):
+        """قائمة (العنصر، العدد التقديري، أقصى خطأ) مرتبة تنازلياً"""
+        ranked = sorted(self._counts.items(), key=lambda x: -x[1])[:limit]
+        return [(item, count, self._errors[item]) for item, count in ranked]
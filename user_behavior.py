@@ -1,37 +1,222 @@
+import math
+import time
+from array import array
+
+# أوزان التفاعل المستخدمة في get_interaction_score (المشاهدة الكاملة watch حسب المدة)
+ACTION_WEIGHTS = {"view": 1, "like": 2, "share": 3}
+
+
+def event_score(action, duration):
+    """وزن تفاعل واحد: view=1، like=2، share=3، watch=المدة بالدقائق"""
+    if action == "watch":
+        return (duration or 0) / 60
+    return ACTION_WEIGHTS.get(action, 0)
+
+
+class Interner:
+    """تحويل النصوص المتكررة (العناصر، التصنيفات، الأفعال) إلى أرقام"""
+
+    def __init__(self):
+        self.ids = {}
+        self.values = []
+
+    def __len__(self):
+        return len(self.values)
+
+    def intern(self, value):
+        value_id = self.ids.get(value)
+        if value_id is None:
+            value_id = len(self.values)
+            self.ids[value] = value_id
+            self.values.append(value)
+        return value_id
+
+    def lookup(self, value_id):
+        return self.values[value_id]
+
+
+# نوافذ زمنية اختيارية لدرجات التصنيفات: الاسم -> (المدة بالثواني، عدد الدلاء)
+AFFINITY_WINDOWS = {
+    "1h": (3600, 60),
+    "24h": (24 * 3600, 24),
+    "7d": (7 * 24 * 3600, 28),
+}
+
+# قواميس مشتركة بين كل المستخدمين
+ITEMS = Interner()
+CATEGORIES = Interner()
+ACTIONS = Interner()
+
+_MISSING = float("nan")
+
+
+class EventStore:
+    """
+    سجل أحداث مضغوط على شكل أعمدة (array) بدلاً من dict لكل حدث
+    القراءة تُرجع dict كما في السابق حتى لا يتغير الكود الذي يستخدم user.events
+    """
+
+    def __init__(self):
+        self.item_ids = array("I")
+        self.category_ids = array("I")
+        self.action_ids = array("I")
+        self.timestamps = array("d")
+        self.durations = array("d")
+        self.ratings = array("d")
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def append(self, item_name, category, action, duration=None, rating=None, timestamp=None):
+        self.item_ids.append(ITEMS.intern(item_name))
+        self.category_ids.append(CATEGORIES.intern(category))
+        self.action_ids.append(ACTIONS.intern(action))
+        self.timestamps.append(time.time() if timestamp is None else timestamp)
+        self.durations.append(_MISSING if duration is None else duration)
+        self.ratings.append(_MISSING if rating is None else rating)
+
+    def event(self, index):
+        duration = self.durations[index]
+        rating = self.ratings[index]
+        return {
+            "item": ITEMS.lookup(self.item_ids[index]),
+            "category": CATEGORIES.lookup(self.category_ids[index]),
+            "action": ACTIONS.lookup(self.action_ids[index]),
+            "duration": None if math.isnan(duration) else duration,
+            "rating": None if math.isnan(rating) else rating,
+            "timestamp": self.timestamps[index]
+        }
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.event(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("event index out of range")
+        return self.event(index)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.event(i)
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def memory_bytes(self):
+        """الحجم التقريبي للأعمدة بالبايت"""
+        columns = (self.item_ids, self.category_ids, self.action_ids,
+                   self.timestamps, self.durations, self.ratings)
+        return sum(column.itemsize * len(column) for column in columns)
+
+
+class WindowedScores:
+    """
+    مجموع درجات التصنيفات خلال نافذة زمنية منزلقة
+    على شكل حلقة من الدلاء، الدلو الذي يخرج من النافذة يُطرح من المجموع
+    """
+
+    def __init__(self, span, num_buckets):
+        self.bucket_seconds = span / num_buckets
+        self.num_buckets = num_buckets
+        self.buckets = [None] * num_buckets
+        self.totals = {}
+        self.latest = None  # رقم أحدث دلو
+
+    def _advance(self, bucket):
+        if self.latest is not None and bucket <= self.latest:
+            return
+        if self.latest is None:
+            self.latest = bucket
+            return
+        first = max(self.latest + 1, bucket - self.num_buckets + 1)
+        for b in range(first, bucket + 1):
+            self._expire(b % self.num_buckets)
+        self.latest = bucket
+
+    def _expire(self, slot):
+        old = self.buckets[slot]
+        if not old:
+            return
+        for category, score in old.items():
+            remaining = self.totals[category] - score
+            if abs(remaining) < 1e-9:
+                del self.totals[category]
+            else:
+                self.totals[category] = remaining
+        self.buckets[slot] = None
+
+    def add(self, category, score, timestamp):
+        bucket = int(timestamp // self.bucket_seconds)
+        self._advance(bucket)
+        if bucket <= self.latest - self.num_buckets:
+            return  # أقدم من النافذة
+        slot = bucket % self.num_buckets
+        if self.buckets[slot] is None:
+            self.buckets[slot] = {}
+        self.buckets[slot][category] = self.buckets[slot].get(category, 0) + score
+        self.totals[category] = self.totals.get(category, 0) + score
+
+    def scores(self, now):
+        self._advance(int(now // self.bucket_seconds))
+        return self.totals
+
+
 class UserBehavior:
-    def __init__(self, user_id, username):
+    def __init__(self, user_id, username, windows=(), clock=time.time):
         self.user_id = user_id
         self.username = username
-        self.events = []
+        self.events = EventStore()
         self.interests = set()
         self.watch_history = []
-    
-    def add_event(self, item_name, category, action, duration=None, rating=None):
-        event = {
-            "item": item_name,
-            "category": category,
-            "action": action,
-            "duration": duration,
-            "rating": rating
-        }
-        self.events.append(event)
-        
+        self.clock = clock
+        # مجموع أوزان التفاعل لكل تصنيف (يُحدَّث مع كل حدث)
+        self._category_scores = {}
+        # نوافذ زمنية اختيارية، مثل windows=("1h", "24h", "7d")
+        self._windows = {name: WindowedScores(*AFFINITY_WINDOWS[name]) for name in windows}
+
+    def add_event(self, item_name, category, action, duration=None, rating=None, timestamp=None):
+        if timestamp is None:
+            timestamp = self.clock()
+        self.events.append(item_name, category, action, duration, rating, timestamp)
+
+        score = event_score(action, duration)
+        if score:
+            self._category_scores[category] = self._category_scores.get(category, 0) + score
+            for window in self._windows.values():
+                window.add(category, score, timestamp)
+
         if action in ["like", "watch", "share"] and duration and duration > 30:
             self.interests.add(category)
-        
+
         if action == "watch":
             self.watch_history.append(item_name)
-    
-    def get_interaction_score(self, category):
-        score = 0
-        for event in self.events:
-            if event["category"] == category:
-                if event["action"] == "view":
-                    score += 1
-                elif event["action"] == "like":
-                    score += 2
-                elif event["action"] == "share":
-                    score += 3
-                elif event["action"] == "watch":
-                    score += (event.get("duration", 0) / 60)
-        return score
\ No newline at end of file
+
+    def get_interaction_score(self, category, window=None):
+        return self._scores(window).get(category, 0)
+
+    def get_affinity_vector(self, window=None):
+        """درجات كل التصنيفات دفعة واحدة: {التصنيف: الدرجة}"""
+        return dict(self._scores(window))
+
+    def to_numpy_row(self, categories, window=None):
+        """متجه الدرجات بترتيب قائمة التصنيفات المعطاة (لحساب دفعات من المستخدمين)"""
+        import numpy as np
+        scores = self._scores(window)
+        return np.array([scores.get(category, 0) for category in categories], dtype=np.float64)
+
+    def _scores(self, window):
+        if window is None:
+            return self._category_scores
+        if window not in self._windows:
+            raise KeyError(f"Window not tracked: {window}")
+        return self._windows[window].scores(self.clock())
+
+
+def affinity_matrix(users, categories, window=None):
+    """مصفوفة (مستخدم × تصنيف) من درجات عدة مستخدمين"""
+    import numpy as np
+    matrix = np.zeros((len(users), len(categories)), dtype=np.float64)
+    for row, user in enumerate(users):
+        matrix[row] = user.to_numpy_row(categories, window)
+    return matrix
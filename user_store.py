@@ -0,0 +1,463 @@
+"""
+تخزين حسابات المستخدمين لـ AuthenticationSystem
+SQLiteUserStore: جدول SQLite (اسم المستخدم مفتاح أساسي = فهرس) بواجهة تشبه dict،
+كل كتابة داخل معاملة (transaction) فلا يتلف الملف عند انقطاع التشغيل
+ShardedJsonUserStore: ملفات JSON مقسمة حسب تجزئة اسم المستخدم مع فهرس،
+كل جزء يُحمَّل عند أول وصول لأحد مستخدميه
+WriteBehindWriter: خيط خلفي يجمع المستخدمين المعدلين ويكتبهم دفعة واحدة
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from collections.abc import MutableMapping
+
+# حجم أجزاء ShardedJsonUserStore: العدد يتضاعف عندما يتجاوز متوسط الجزء MAX_SHARD_USERS
+MIN_NUM_SHARDS = 64
+LEGACY_NUM_SHARDS = 64  # مجلدات أنشئت قبل meta.json
+TARGET_SHARD_USERS = 128
+MAX_SHARD_USERS = 512
+
+
+class SQLiteUserStore(MutableMapping):
+    def __init__(self, path="users_data.db", legacy_json=None):
+        self.path = path
+        # يُمسك عند تعديل سجل في الذاكرة حتى لا يُكتب وهو في منتصف التعديل
+        self.lock = threading.RLock()
+        self._cache = {}  # السجلات التي تمت قراءتها (نفس الكائن يُرجع في كل مرة)
+
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS users ("
+                "username TEXT PRIMARY KEY, user_id TEXT NOT NULL UNIQUE, data TEXT NOT NULL)"
+            )
+
+        if legacy_json and os.path.exists(legacy_json) and len(self) == 0:
+            self._import_json(legacy_json)
+
+    def _import_json(self, filename):
+        """نقل ملف users_data.json القديم مرة واحدة"""
+        try:
+            with open(filename, 'r', encoding='utf-8') as f:
+                users = json.load(f)
+        except (OSError, ValueError):
+            return
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO users (username, user_id, data) VALUES (?, ?, ?)",
+                [(name, data["user_id"], json.dumps(data, ensure_ascii=False)) for name, data in users.items()]
+            )
+
+    # --- واجهة dict ---
+
+    def __getitem__(self, username):
+        with self.lock:
+            record = self._cache.get(username)
+            if record is None:
+                row = self.conn.execute("SELECT data FROM users WHERE username = ?", (username,)).fetchone()
+                if row is None:
+                    raise KeyError(username)
+                record = self._cache[username] = json.loads(row[0])
+            return record
+
+    def __setitem__(self, username, record):
+        with self.lock:
+            self._cache[username] = record
+            self.save(username)
+
+    def __delitem__(self, username):
+        with self.lock, self.conn:
+            cursor = self.conn.execute("DELETE FROM users WHERE username = ?", (username,))
+            self._cache.pop(username, None)
+            if cursor.rowcount == 0:
+                raise KeyError(username)
+
+    def __contains__(self, username):
+        with self.lock:
+            if username in self._cache:
+                return True
+            return self.conn.execute("SELECT 1 FROM users WHERE username = ?", (username,)).fetchone() is not None
+
+    def __iter__(self):
+        with self.lock:
+            rows = self.conn.execute("SELECT username FROM users ORDER BY rowid").fetchall()
+        return iter([row[0] for row in rows])
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+    # --- الكتابة ---
+
+    def mark_dirty(self, username):
+        """السجلات المعدلة تبقى في _cache حتى تُكتب، لا شيء إضافي هنا"""
+
+    def save(self, username):
+        """كتابة سجل مستخدم واحد (بعد تعديله في الذاكرة)"""
+        self.save_many([username])
+
+    def save_many(self, usernames):
+        with self.lock:
+            rows = []
+            for username in usernames:
+                record = self._cache.get(username)
+                if record is not None:
+                    rows.append((username, record["user_id"], json.dumps(record, ensure_ascii=False)))
+            if not rows:
+                return
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT INTO users (username, user_id, data) VALUES (?, ?, ?) "
+                    "ON CONFLICT(username) DO UPDATE SET user_id = excluded.user_id, data = excluded.data",
+                    rows
+                )
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+class ShardedJsonUserStore(MutableMapping):
+    """
+    التخطيط على القرص:
+        meta.json        عدد الأجزاء والجيل الحالي لأسماء ملفاتها
+        index.jsonl      سطر لكل مستخدم {"username", "user_id"} (إضافة فقط)،
+                         والحذف سطر {"username", "deleted": true}
+        shard_007.json   سجلات المستخدمين الذين تقع أسماؤهم في الجزء 7
+    عند البدء يُقرأ الفهرس كاملاً (أسماء ومعرفات فقط، O(عدد المستخدمين))
+    ويُضغط إذا زادت الأسطر المحذوفة عن الحية. الأجزاء تُقرأ عند الحاجة ويبقى
+    في الذاكرة max_loaded_shards منها فقط (الأقل استخداماً يُحذف إذا لم يكن معدلاً)،
+    وعدد الأجزاء يتضاعف مع نمو المستخدمين حتى يبقى حجم الجزء محدوداً
+    وكل ملف يُكتب في ملف مؤقت ثم os.replace (كتابة ذرية)
+    """
+
+    def __init__(self, directory="users_data", num_shards=None, legacy_json=None, max_loaded_shards=32):
+        self.directory = directory
+        self.max_loaded_shards = max_loaded_shards
+        self.lock = threading.RLock()
+        self.index = {}  # اسم المستخدم -> user_id (بترتيب التسجيل)
+        self._shards = OrderedDict()  # رقم الجزء -> {اسم المستخدم: السجل} للأجزاء المحملة (LRU)
+        self._dirty_shards = set()  # أجزاء فيها تعديلات لم تُكتب بعد (لا تُحذف من الذاكرة)
+        self.shard_loads = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._index_file = os.path.join(directory, "index.jsonl")
+        self._meta_file = os.path.join(directory, "meta.json")
+        self._load_meta(num_shards)
+        self._load_index()
+
+        if legacy_json and os.path.exists(legacy_json) and not self.index:
+            self._import_json(legacy_json)
+
+    def _load_meta(self, num_shards):
+        if os.path.exists(self._meta_file):
+            with open(self._meta_file, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            self.num_shards, self.generation = meta["num_shards"], meta["generation"]
+            return
+        # مجلد أنشئ قبل meta.json كان بعدد أجزاء ثابت
+        existing = os.path.exists(self._index_file)
+        self.num_shards = LEGACY_NUM_SHARDS if existing else (num_shards or MIN_NUM_SHARDS)
+        self.generation = 0
+        self._write_meta()
+
+    def _write_meta(self):
+        _write_json(self._meta_file, {"num_shards": self.num_shards, "generation": self.generation})
+
+    def _load_index(self):
+        if not os.path.exists(self._index_file):
+            return
+        lines = 0
+        with open(self._index_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                lines += 1
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # سطر أخير ناقص بعد انقطاع التشغيل
+                if entry.get("deleted"):
+                    self.index.pop(entry["username"], None)
+                else:
+                    self.index[entry["username"]] = entry["user_id"]
+        if lines > 2 * len(self.index):
+            self._compact_index()
+
+    def _compact_index(self):
+        """إعادة كتابة الفهرس بالمستخدمين الحاليين فقط (بدون أسطر الحذف)"""
+        tmp_path = self._index_file + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for username, user_id in self.index.items():
+                f.write(json.dumps({"username": username, "user_id": user_id}, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._index_file)
+
+    def _import_json(self, filename):
+        try:
+            with open(filename, 'r', encoding='utf-8') as f:
+                users = json.load(f)
+        except (OSError, ValueError):
+            return
+        with self.lock:
+            self.num_shards = max(self.num_shards, _shards_for(len(users)))
+            self._write_meta()
+            # الأجزاء تُكتب مباشرة بدون تحميلها في الذاكرة
+            shards = {}
+            for username, record in users.items():
+                shards.setdefault(self.shard_of(username), {})[username] = record
+            for shard, records in shards.items():
+                _write_json(self._shard_file(shard), records)
+            self._append_index([{"username": u, "user_id": r["user_id"]} for u, r in users.items()])
+            self.index.update((u, r["user_id"]) for u, r in users.items())
+
+    def shard_of(self, username, num_shards=None):
+        # تجزئة ثابتة بين التشغيلات (hash() في بايثون عشوائية لكل عملية)
+        digest = hashlib.md5(username.encode("utf-8")).digest()
+        return int.from_bytes(digest[:4], "little") % (num_shards or self.num_shards)
+
+    def _shard_file(self, shard, generation=None):
+        generation = self.generation if generation is None else generation
+        prefix = "shard_" if generation == 0 else f"shard_g{generation}_"
+        return os.path.join(self.directory, f"{prefix}{shard:03d}.json")
+
+    def _read_shard(self, shard, generation=None):
+        path = self._shard_file(shard, generation)
+        if not os.path.exists(path):
+            return {}
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _shard(self, shard):
+        records = self._shards.get(shard)
+        if records is None:
+            records = self._shards[shard] = self._read_shard(shard)
+            self.shard_loads += 1
+            self._evict()
+        else:
+            self._shards.move_to_end(shard)
+        return records
+
+    def _evict(self):
+        """حذف الأجزاء الأقل استخداماً من الذاكرة (المعدلة تبقى حتى تُكتب)"""
+        excess = len(self._shards) - self.max_loaded_shards
+        if excess <= 0:
+            return
+        for shard in [s for s in self._shards if s not in self._dirty_shards][:excess]:
+            del self._shards[shard]
+
+    # --- واجهة dict ---
+
+    def __getitem__(self, username):
+        with self.lock:
+            if username not in self.index:
+                raise KeyError(username)
+            return self._shard(self.shard_of(username))[username]
+
+    def __setitem__(self, username, record):
+        with self.lock:
+            self._shard(self.shard_of(username))[username] = record
+            self.save(username)
+
+    def __delitem__(self, username):
+        with self.lock:
+            if username not in self.index:
+                raise KeyError(username)
+            # الفهرس أولاً: بعد انقطاع التشغيل يبقى سجل يتيم في الجزء فقط، وليس مستخدم بلا سجل
+            self._append_index([{"username": username, "deleted": True}])
+            del self.index[username]
+            shard = self.shard_of(username)
+            self._shard(shard).pop(username, None)
+            self._write_shard(shard)
+
+    def __contains__(self, username):
+        return username in self.index
+
+    def __iter__(self):
+        with self.lock:
+            return iter(list(self.index))
+
+    def __len__(self):
+        return len(self.index)
+
+    # --- الكتابة ---
+
+    def mark_dirty(self, username):
+        """سجل المستخدم عُدّل في الذاكرة: جزؤه يبقى محملاً حتى save"""
+        with self.lock:
+            shard = self.shard_of(username)
+            if shard in self._shards:
+                self._dirty_shards.add(shard)
+
+    def save(self, username):
+        self.save_many([username])
+
+    def save_many(self, usernames):
+        with self.lock:
+            shards = set()
+            new_entries = []
+            for username in usernames:
+                shard = self.shard_of(username)
+                record = self._shards.get(shard, {}).get(username)
+                if record is None:
+                    continue
+                shards.add(shard)
+                if username not in self.index:
+                    new_entries.append({"username": username, "user_id": record["user_id"]})
+
+            # الأجزاء أولاً ثم الفهرس: المستخدم لا يظهر في الفهرس قبل وجود سجله
+            for shard in shards:
+                self._write_shard(shard)
+            if new_entries:
+                self._append_index(new_entries)
+                for entry in new_entries:
+                    self.index[entry["username"]] = entry["user_id"]
+                if len(self.index) > MAX_SHARD_USERS * self.num_shards:
+                    self._reshard(_shards_for(len(self.index)))
+
+    def _append_index(self, entries):
+        with open(self._index_file, 'a', encoding='utf-8') as f:
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _write_shard(self, shard):
+        _write_json(self._shard_file(shard), self._shards[shard])
+        self._dirty_shards.discard(shard)
+
+    def _reshard(self, num_shards):
+        """
+        إعادة توزيع المستخدمين على num_shards جزءاً (نادر: العدد يتضاعف).
+        الجيل الجديد يُكتب كاملاً ثم يُعتمد بكتابة meta.json، فانقطاع التشغيل
+        قبلها يترك التخطيط القديم سليماً
+        """
+        old_shards, old_generation = self.num_shards, self.generation
+        generation = old_generation + 1
+        new = {}
+        for shard in range(old_shards):
+            records = self._shards[shard] if shard in self._shards else self._read_shard(shard)
+            for username, record in records.items():
+                if username in self.index:
+                    new.setdefault(self.shard_of(username, num_shards), {})[username] = record
+        for shard, records in new.items():
+            _write_json(self._shard_file(shard, generation), records)
+
+        self.num_shards, self.generation = num_shards, generation
+        self._write_meta()
+        self._shards.clear()
+        self._dirty_shards.clear()
+        for shard in range(old_shards):
+            try:
+                os.remove(self._shard_file(shard, old_generation))
+            except FileNotFoundError:
+                pass
+
+    def close(self):
+        pass
+
+
+def _shards_for(num_users):
+    """أصغر عدد أجزاء (قوة 2) يبقي متوسط الجزء حول TARGET_SHARD_USERS"""
+    num_shards = MIN_NUM_SHARDS
+    while num_users > TARGET_SHARD_USERS * num_shards:
+        num_shards *= 2
+    return num_shards
+
+
+def _write_json(path, data):
+    """كتابة ذرية: ملف مؤقت ثم os.replace"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class WriteBehindWriter:
+    """
+    كتابة مؤجلة: المستدعي يعلّم المستخدم كمعدَّل ويعود فوراً،
+    والخيط الخلفي يكتب المعدلين (كل مستخدم مرة واحدة مهما تكرر تعديله)
+    كل interval ثانية أو عند وصول عددهم إلى max_dirty
+    """
+
+    def __init__(self, store, interval=1.0, max_dirty=100):
+        self.store = store
+        self.interval = interval
+        self.max_dirty = max_dirty
+        self.flushes = 0
+        self.failures = 0
+        self._dirty = set()
+        self._condition = threading.Condition()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="user-store-writer", daemon=True)
+        self._thread.start()
+
+    def mark_dirty(self, username):
+        self.store.mark_dirty(username)
+        with self._condition:
+            self._dirty.add(username)
+            if len(self._dirty) >= self.max_dirty:
+                self._condition.notify()
+
+    def pending(self):
+        with self._condition:
+            return len(self._dirty)
+
+    def _take(self):
+        batch, self._dirty = self._dirty, set()
+        return batch
+
+    def _write(self, batch):
+        if batch:
+            self.store.save_many(batch)
+            self.flushes += 1
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(
+                    lambda: self._stopped or len(self._dirty) >= self.max_dirty,
+                    timeout=self.interval
+                )
+                batch = self._take()
+                stopped = self._stopped
+            try:
+                self._write(batch)
+            except Exception as e:
+                # قرص ممتلئ أو قاعدة مقفلة: نعيد الدفعة للمعلق ونحاول في الدورة التالية
+                print(f"⚠️ فشل حفظ {len(batch)} مستخدم: {e}")
+                self.failures += 1
+                with self._condition:
+                    self._dirty |= batch
+                    if not stopped:
+                        # انتظار interval قبل إعادة المحاولة (وإلا تتكرر فوراً عند تجاوز max_dirty)
+                        self._condition.wait_for(lambda: self._stopped, timeout=self.interval)
+            if stopped:
+                return
+
+    def flush(self):
+        """كتابة كل المعلق الآن (متزامن، الخطأ يصل للمستدعي والدفعة تبقى معلقة)"""
+        with self._condition:
+            batch = self._take()
+        try:
+            self._write(batch)
+        except Exception:
+            with self._condition:
+                self._dirty |= batch
+            raise
+
+    def close(self):
+        """إيقاف الخيط بعد كتابة كل المعلق"""
+        with self._condition:
+            if self._stopped:
+                return
+            self._stopped = True
+            self._condition.notify()
+        self._thread.join()
+        self.flush()